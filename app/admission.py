@@ -0,0 +1,189 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import orjson
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .config import get_settings
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+settings = get_settings()
+
+READ, WRITE, AUTH = "read", "write", "auth"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Never shed: monitoring must keep working while the API is overloaded
+EXEMPT_PATHS = ("/metrics",)
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """read, write or auth for a request, from its method and path alone (before routing)"""
+    if path in EXEMPT_PATHS:
+        return None
+    # Password hashing: login, register, password changes and admin user creation
+    if path.startswith("/auth/") or path == "/users/me/password" or (method == "POST" and path == "/users/"):
+        return AUTH
+    if method in READ_METHODS or path == "/prayers/batch":
+        return READ
+    return WRITE
+
+class AdmissionGate:
+    """At most `concurrency` requests at once, `queue` more waiting up to `timeout` seconds.
+
+    Lives on the event loop, so it needs no locks; a released slot is handed
+    straight to the oldest waiter.
+    """
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> Optional[str]:
+        """None once admitted, otherwise why the request was shed"""
+        if self.active < self.concurrency and not self._waiters:
+            self._admit()
+            return None
+        if len(self._waiters) >= self.queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.labels(self.name).inc()
+        try:
+            await asyncio.wait((waiter,), timeout=self.timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if waiter.done():
+            return None  # release() handed over its slot
+        self._abandon(waiter)
+        return "queue_timeout"
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            ADMISSION_QUEUED.labels(self.name).dec()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+
+    def _admit(self):
+        self.active += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            self.release()  # admitted while being cancelled: pass the slot on
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+            ADMISSION_QUEUED.labels(self.name).dec()
+        except ValueError:
+            pass
+
+class TokenBuckets:
+    """Per-client token buckets: `rate` requests per second with bursts up to `burst`"""
+    PRUNE_INTERVAL = 60.0  # seconds
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}  # key -> (tokens, updated)
+        self._pruned = time.monotonic()
+
+    def take(self, key: Tuple[str, str]) -> float:
+        """0 if a token was taken, otherwise seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self._buckets[key] = (tokens - 1, now)
+        if now - self._pruned > self.PRUNE_INTERVAL:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float):
+        # A bucket idle long enough to refill completely is the same as no bucket
+        full_after = self.burst / self.rate
+        self._buckets = {key: value for key, value in self._buckets.items() if now - value[1] < full_after}
+        self._pruned = now
+
+def _client_id(scope: Scope, trust_forwarded: bool) -> str:
+    if trust_forwarded:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+async def _reject(send: Send, status: int, detail: str, retry_after: float):
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AdmissionMiddleware:
+    """Caps in-flight requests per route class and rate-limits clients.
+
+    Each class (cheap reads, admin writes, password hashing) has its own
+    concurrency limit and bounded wait queue. Saturated bulk writes or
+    logins therefore never hold up prayer reads. Requests that find the
+    queue full, or wait longer than ADMISSION_QUEUE_TIMEOUT, get 503. A
+    client over its token bucket gets 429. Both answers carry `Retry-After`.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT
+        self.gates = {
+            READ: AdmissionGate(READ, settings.ADMISSION_READ_CONCURRENCY, settings.ADMISSION_READ_QUEUE, timeout),
+            WRITE: AdmissionGate(WRITE, settings.ADMISSION_WRITE_CONCURRENCY, settings.ADMISSION_WRITE_QUEUE, timeout),
+            AUTH: AdmissionGate(AUTH, settings.ADMISSION_AUTH_CONCURRENCY, settings.ADMISSION_AUTH_QUEUE, timeout),
+        }
+        rates = {
+            READ: (settings.RATE_LIMIT_READ_PER_SECOND, settings.RATE_LIMIT_READ_BURST),
+            WRITE: (settings.RATE_LIMIT_WRITE_PER_SECOND, settings.RATE_LIMIT_WRITE_BURST),
+            AUTH: (settings.RATE_LIMIT_AUTH_PER_SECOND, settings.RATE_LIMIT_AUTH_BURST),
+        }
+        self.buckets = {name: TokenBuckets(rate, burst) for name, (rate, burst) in rates.items() if rate > 0}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        buckets = self.buckets.get(name)
+        if buckets is not None:
+            wait = buckets.take((name, _client_id(scope, settings.RATE_LIMIT_TRUST_FORWARDED)))
+            if wait:
+                ADMISSION_REJECTED.labels(name, "rate_limited").inc()
+                await _reject(send, 429, "Too many requests, please slow down", wait)
+                return
+
+        gate = self.gates[name]
+        shed = await gate.acquire()
+        if shed is not None:
+            ADMISSION_REJECTED.labels(name, shed).inc()
+            await _reject(send, 503, "Server is busy, please retry", settings.ADMISSION_RETRY_AFTER)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
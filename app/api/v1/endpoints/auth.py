@@ -1,51 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
-from ....database import get_session
+from sqlmodel import Session, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ....database import get_async_session, get_session, save
 from ....models.user import User
 from ....schemas.user import UserCreate
 from ....schemas.token import Token
-from ....security import create_access_token
+from ....security import create_access_token, password_hasher
 
 router = APIRouter()
 
+# Password hashing runs in the hasher's process pool. Lookups go through the
+# reader engine and the writer (and its write lock) is only taken once the hash
+# is ready, so a burst of logins neither blocks the event loop nor the writer.
 @router.post("/register", response_model=Token)
-def register(
+async def register(
     user: UserCreate,
     session: Session = Depends(get_session),
+    reader: AsyncSession = Depends(get_async_session),
     response: Response = None
 ):
-    if session.exec(select(User).where(User.email == user.email)).first():
+    if (await reader.exec(select(User).where(User.email == user.email))).first():
         raise HTTPException(status_code=400, detail="Email already registered")
 
     new_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=User.hash_password(user.password),
+        hashed_password=await password_hasher.hash(user.password),
         role="panel"
     )
-    session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    new_user = await run_in_threadpool(save, session, new_user)
 
-    token = create_access_token(data={"sub": new_user.username, "role": new_user.role})
+    token = create_access_token(data={"sub": new_user.username, "role": new_user.role, "uid": new_user.id})
     response.set_cookie(key="token", value=token, httponly=True)
     return Token(access_token=token, token_type="bearer")
 
+def _rehash(session: Session, user_id: int, hashed_password: str):
+    session.exec(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+    session.commit()
+
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(get_session),
+    reader: AsyncSession = Depends(get_async_session),
     response: Response = None
 ):
-    user = session.exec(
+    user = (await reader.exec(
         select(User).where(User.username == form_data.username)
-    ).first()
-    
-    if not user or not user.verify_password(form_data.password):
+    )).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored with another BCRYPT_ROUNDS cost: upgrade while we have the plaintext
+        await run_in_threadpool(_rehash, session, user.id, new_hash)
 
-    token = create_access_token(data={"sub": user.username, "role": user.role})
+    token = create_access_token(data={"sub": user.username, "role": user.role, "uid": user.id})
     response.set_cookie(key="token", value=token, httponly=True)
     return Token(access_token=token, token_type="bearer")
 
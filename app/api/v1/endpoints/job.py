@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from ....database import get_async_session
+from ....dependencies import Claims, require_role
+from ....jobs import JOB_STATUS_COLUMNS, jobs, job_status
+from ....schemas.job import JobResponse
+
+router = APIRouter()
+
+# 🔐 GET recent jobs, newest first (Admin Only)
+@router.get("/", response_model=List[JobResponse])
+async def get_jobs(
+    status: Optional[str] = None,
+    limit: int = 50,
+    admin: Claims = Depends(require_role("admin")),
+    session: AsyncSession = Depends(get_async_session)
+):
+    query = select(*JOB_STATUS_COLUMNS).order_by(jobs.c.id.desc()).limit(min(limit, 500))
+    if status:
+        query = query.where(jobs.c.status == status)
+    return [job_status(row) for row in (await session.exec(query)).all()]
+
+# 🔐 GET a job's progress, rows applied and errors (Admin Only)
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    admin: Claims = Depends(require_role("admin")),
+    session: AsyncSession = Depends(get_async_session)
+):
+    row = (await session.exec(select(*JOB_STATUS_COLUMNS).where(jobs.c.id == job_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(row)
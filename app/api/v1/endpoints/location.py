@@ -1,53 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
 from typing import List
-from ....database import get_session
-from ....models.user import User
-from ....models.location import Location
-from ....schemas.location import LocationResponse, LocationCreate, LocationUpdate
-from ....dependencies import require_role
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ....database import get_session, get_async_session
+from ....models.location import Location, normalize_name
+from ....models.prayer import PrayerTime
+from ....schemas.location import LocationResponse, LocationCreate, LocationUpdate, NearestLocationResponse
+from ....dependencies import Claims, require_role
+from ....cache import invalidate_prayer_times
+from ....crud.location import LOCATION_COLUMNS, location_names
+from ....crud.prayer import PRAYER_TIME_COLUMNS
+from ....conditional import check_not_modified
+from ....query_budget import query_budget
+from ....pagination import PageParams, paginate, set_next_cursor, stream_ndjson
+from ....serialization import json_response, rows_response
+from ....spatial import nearest_locations
 
 router = APIRouter()
 
 # ✅ GET all locations
 @router.get("/", response_model=List[LocationResponse])
-def get_locations(session: Session = Depends(get_session)):
-    return session.exec(select(Location)).all()
+@query_budget(1)
+async def get_locations(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_async_session)
+):
+    query = paginate(select(*LOCATION_COLUMNS), Location.id, page)
+    if page.format == "ndjson":
+        return stream_ndjson(query)
+
+    locations = (await session.exec(query)).all()
+    set_next_cursor(response, locations, page)
+    return check_not_modified(request, response, locations) or rows_response(response, locations)
+
+# 🌐 GET nearest locations to a coordinate
+@router.get("/nearest", response_model=List[NearestLocationResponse])
+@query_budget(2)
+async def get_nearest_locations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, ge=1, le=100),
+    include_prayer_times: bool = False,
+    session: AsyncSession = Depends(get_async_session)
+):
+    if not nearest_locations.loaded:
+        await nearest_locations.load(session, LOCATION_COLUMNS)
+
+    results = [
+        {**location, "distance_km": round(distance, 3)}
+        for location, distance in nearest_locations.nearest(lat, lon, k)
+    ]
+
+    # Attach each location's prayer times for its own local "today"
+    if include_prayer_times and results:
+        today = {result["id"]: _local_today(result["timezone"]) for result in results}
+        prayer_times = (await session.exec(
+            select(*PRAYER_TIME_COLUMNS).where(
+                PrayerTime.location_id.in_(today),
+                PrayerTime.date.in_(set(today.values()))
+            )
+        )).all()
+        by_location = {row.location_id: row._asdict() for row in prayer_times if row.date == today[row.location_id]}
+        for result in results:
+            result["prayer_time"] = by_location.get(result["id"])
+
+    return json_response(results)
+
+def _local_today(timezone_name: str) -> date:
+    try:
+        return datetime.now(ZoneInfo(timezone_name)).date()
+    except (ZoneInfoNotFoundError, ValueError):
+        return datetime.now(timezone.utc).date()
 
 # ✅ GET a single location
-@router.get("/{location_id}", response_model=LocationResponse)
-def get_location(location_id: int, session: Session = Depends(get_session)):
-    location = session.get(Location, location_id)
+@router.get("/{location_id:int}", response_model=LocationResponse)
+@query_budget(1)
+async def get_location(
+    location_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
+):
+    location = await session.get(Location, location_id)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
-    return location
+    return check_not_modified(request, response, [location]) or location
 
 # ✅ CREATE a location (Admin only)
 @router.post("/", response_model=LocationResponse)
-def create_location(location_create: LocationCreate, admin: User = Depends(require_role("admin")),
+def create_location(location_create: LocationCreate, admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)):
-    if session.get(Location, location_create.city):
+    # Imported on first use: app.calculation pulls in numpy
+    from ....calculation import CALCULATION_METHODS
+    if session.exec(select(Location.id).where(Location.city_key == normalize_name(location_create.city))).first():
         raise HTTPException(status_code=400, detail="Location already exists")
+    if location_create.calculation_method not in CALCULATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown calculation method '{location_create.calculation_method}'")
     
     new_location = Location(
         city=location_create.city,
         country=location_create.country,
         latitude=location_create.latitude,
         longitude=location_create.longitude,
-        timezone=location_create.timezone
+        timezone=location_create.timezone,
+        calculation_method=location_create.calculation_method
     )
 
     session.add(new_location)
     session.commit()
     session.refresh(new_location)
+    location_names.invalidate()
+    nearest_locations.upsert(LocationResponse.model_validate(new_location).model_dump())
     return new_location
 
 # ✅ UPDATE a location (Admin only)
-@router.put("/{location_id}", response_model=LocationResponse)
+@router.put("/{location_id:int}", response_model=LocationResponse)
 def update_location(
     location_id: int,
     location_update: LocationUpdate,
-    admin: User = Depends(require_role("admin")),
+    admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)
 ):
     location = session.get(Location, location_id)
@@ -55,6 +130,10 @@ def update_location(
         raise HTTPException(status_code=404, detail="Location not found")
     
     if location_update.city:
+        if session.exec(select(Location.id).where(
+            Location.city_key == normalize_name(location_update.city), Location.id != location_id
+        )).first():
+            raise HTTPException(status_code=400, detail="Location already exists")
         location.city = location_update.city
     if location_update.country:
         location.country = location_update.country
@@ -64,19 +143,31 @@ def update_location(
         location.longitude = location_update.longitude
     if location_update.timezone:
         location.timezone = location_update.timezone
+    if location_update.calculation_method:
+        from ....calculation import CALCULATION_METHODS
+        if location_update.calculation_method not in CALCULATION_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown calculation method '{location_update.calculation_method}'")
+        location.calculation_method = location_update.calculation_method
+    location.updated_at = datetime.now(timezone.utc)
 
     session.add(location)
     session.commit()
     session.refresh(location)
+    invalidate_prayer_times(location.id)
+    location_names.invalidate()
+    nearest_locations.upsert(LocationResponse.model_validate(location).model_dump())
     return location
 
 # ✅ DELETE a location (Admin only)
-@router.delete("/{location_id}")
-def delete_location(location_id: int, admin: User = Depends(require_role("admin")), session: Session = Depends(get_session)):
+@router.delete("/{location_id:int}")
+def delete_location(location_id: int, admin: Claims = Depends(require_role("admin")), session: Session = Depends(get_session)):
     location = session.get(Location, location_id)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
     
     session.delete(location)
     session.commit()
+    invalidate_prayer_times(location_id)
+    location_names.invalidate()
+    nearest_locations.remove(location_id)
     return {"message": "Location deleted successfully"}
\ No newline at end of file
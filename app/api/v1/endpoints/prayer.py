@@ -1,67 +1,109 @@
-from datetime import date, datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, delete
-from typing import List
-from ....database import get_session
-from ....models.user import User
+from datetime import date, datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel import Session, select, delete, insert
+from typing import List, Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ....config import get_settings
+from ....database import get_session, get_async_session
 from ....models.location import Location
 from ....models.prayer import PrayerTime
-from ....schemas.prayer import PrayerTimeResponse, PrayerTimeCreate, BulkPrayerTimeCreate, PrayerTimeUpdate, BulkPrayerTimeUpdate
-from ....dependencies import require_role
+from ....schemas.job import JobResponse
+from ....schemas.prayer import PrayerTimeResponse, PrayerTimeCreate, BulkPrayerTimeCreate, PrayerTimeUpdate, BulkPrayerTimeUpdate, PrayerTimeGenerate, NextPrayerResponse, PrayerTimeBatchKey, PrayerTimeBatchResult
+from ....dependencies import Claims, require_role
+from ....pagination import PageParams, paginate, set_next_cursor, stream_ndjson
+from ....cache import CachedResponse, clear_prayer_times, invalidate_prayer_times, prayer_cache
+from ....timetable import timetable_store
+from ....jobs import CREATE_PRAYER_TIMES, UPDATE_PRAYER_TIMES, submit_job
+from ....schedule import build_schedule, get_zone, locate, schedule_cache
+from ....conditional import check_not_modified, is_conditional, is_not_modified, not_modified, query_validators, validator_headers, validators_for_rows, weak_etag
+from ....compression import ENCODINGS, compress_async, compressible, pick_encoding
+from ....serialization import encode_row, encode_rows, json_response, rows_response
+from ....crud.location import location_names
+from ....query_budget import query_budget
+from ....crud.prayer import PRAYER_TIME_COLUMNS, batch_keys_parameter, batch_prayer_times_query, resolve_locations, day_range, validate_bulk_items, existing_prayer_times, insert_prayer_times, bulk_create_rows, apply_bulk_updates
 
 router = APIRouter()
+settings = get_settings()
 
 # ✅ GET all prayer times
 @router.get("/", response_model=List[PrayerTimeResponse])
-def get_prayer_times(session: Session = Depends(get_session)):
-    return session.exec(select(PrayerTime)).all()
+@query_budget(1)
+async def get_prayer_times(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_async_session)
+):
+    query = paginate(select(*PRAYER_TIME_COLUMNS), PrayerTime.id, page)
+    if page.format == "ndjson":
+        return stream_ndjson(query)
+
+    prayer_times = (await session.exec(query)).all()
+    set_next_cursor(response, prayer_times, page)
+    return check_not_modified(request, response, prayer_times) or rows_response(response, prayer_times)
 
 # ✅ GET a single prayer time
-@router.get("/{prayer_time_id}", response_model=PrayerTimeResponse)
-def get_prayer_time(prayer_time_id: int, session: Session = Depends(get_session)):
-    prayer_time = session.get(PrayerTime, prayer_time_id)
+@router.get("/{prayer_time_id:int}", response_model=PrayerTimeResponse)
+@query_budget(1)
+async def get_prayer_time(
+    prayer_time_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
+):
+    prayer_time = await session.get(PrayerTime, prayer_time_id)
     if not prayer_time:
         raise HTTPException(status_code=404, detail="Prayer time not found")
-    return prayer_time
+    return check_not_modified(request, response, [prayer_time]) or prayer_time
 
 # ✅ CREATE a prayer time (Admin only)
 @router.post("/", response_model=PrayerTimeResponse)
-def create_prayer_time(prayer_time_create: PrayerTimeCreate, admin: User = Depends(require_role("admin")),
+def create_prayer_time(prayer_time_create: PrayerTimeCreate, admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)):
-    if session.get(PrayerTime, prayer_time_create.city):
+    if session.exec(
+        select(PrayerTime.id).where(
+            PrayerTime.location_id == prayer_time_create.location_id,
+            PrayerTime.date == prayer_time_create.date
+        )
+    ).first():
         raise HTTPException(status_code=400, detail="Prayer time already exists")
     
     new_prayer_time = PrayerTime(
-        city=prayer_time_create.city,
-        country=prayer_time_create.country,
+        location_id=prayer_time_create.location_id,
+        date=prayer_time_create.date,
         fajr=prayer_time_create.fajr,
         dhuhr=prayer_time_create.dhuhr,
         asr=prayer_time_create.asr,
         maghrib=prayer_time_create.maghrib,
-        isha=prayer_time_create.isha
+        isha=prayer_time_create.isha,
+        calculation_method=prayer_time_create.calculation_method
     )
 
     session.add(new_prayer_time)
     session.commit()
     session.refresh(new_prayer_time)
+    invalidate_prayer_times(new_prayer_time.location_id, [new_prayer_time.date])
     return new_prayer_time
 
 # ✅ UPDATE a prayer time (Admin only)
-@router.put("/{prayer_time_id}", response_model=PrayerTimeResponse)
+@router.put("/{prayer_time_id:int}", response_model=PrayerTimeResponse)
 def update_prayer_time(
     prayer_time_id: int,
     prayer_time_update: PrayerTimeUpdate,
-    admin: User = Depends(require_role("admin")),
+    admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)
 ):
     prayer_time = session.get(PrayerTime, prayer_time_id)
     if not prayer_time:
         raise HTTPException(status_code=404, detail="Prayer time not found")
     
-    if prayer_time_update.city:
-        prayer_time.city = prayer_time_update.city
-    if prayer_time_update.country:
-        prayer_time.country = prayer_time_update.country
+    # The row's old location/date is evicted after the commit as well as its new one
+    old_key = (prayer_time.location_id, prayer_time.date)
+
+    if prayer_time_update.location_id:
+        prayer_time.location_id = prayer_time_update.location_id
+    if prayer_time_update.date:
+        prayer_time.date = prayer_time_update.date
     if prayer_time_update.fajr:
         prayer_time.fajr = prayer_time_update.fajr
     if prayer_time_update.dhuhr:
@@ -72,120 +114,118 @@ def update_prayer_time(
         prayer_time.maghrib = prayer_time_update.maghrib
     if prayer_time_update.isha:
         prayer_time.isha = prayer_time_update.isha
+    if prayer_time_update.calculation_method:
+        prayer_time.calculation_method = prayer_time_update.calculation_method
+    prayer_time.updated_at = datetime.now(timezone.utc)
 
     session.add(prayer_time)
     session.commit()
     session.refresh(prayer_time)
+    invalidate_prayer_times(old_key[0], [old_key[1]])
+    invalidate_prayer_times(prayer_time.location_id, [prayer_time.date])
     return prayer_time
 
 # ✅ DELETE a prayer time (Admin only)
-@router.delete("/{prayer_time_id}")
-def delete_prayer_time(prayer_time_id: int, admin: User = Depends(require_role("admin")), session: Session = Depends(get_session)):
+@router.delete("/{prayer_time_id:int}")
+def delete_prayer_time(prayer_time_id: int, admin: Claims = Depends(require_role("admin")), session: Session = Depends(get_session)):
     prayer_time = session.get(PrayerTime, prayer_time_id)
     if not prayer_time:
         raise HTTPException(status_code=404, detail="Prayer time not found")
     session.delete(prayer_time)
     session.commit()
+    invalidate_prayer_times(prayer_time.location_id, [prayer_time.date])
     return {"message": "Prayer time deleted successfully"}
 
 # ✅ DELETE all prayer times (Admin only)
 @router.delete("/")
-def delete_all_prayer_times(admin: User = Depends(require_role("admin")), session: Session = Depends(get_session)):
+def delete_all_prayer_times(admin: Claims = Depends(require_role("admin")), session: Session = Depends(get_session)):
     session.exec(delete(PrayerTime))
     session.commit()
+    clear_prayer_times()
     return {"message": "All prayer times deleted successfully"}
 
 # ✅ GET prayer times by city
 @router.get("/city/{city}", response_model=List[PrayerTimeResponse])
-def get_prayer_times_by_city(
+@query_budget(3)
+async def get_prayer_times_by_city(
     city: str, 
-    session: Session = Depends(get_session)
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    # Join PrayerTime with Location to filter by city
-    prayer_times = session.exec(
-        select(PrayerTime)
-        .join(Location)
-        .where(Location.city.lower() == city.lower())
-    ).all()
+    # Resolve the normalized city name to location ids, then seek by location_id
+    location_ids = await location_names.city_ids(session, city)
+    prayer_times = (await session.exec(
+        select(*PRAYER_TIME_COLUMNS).where(PrayerTime.location_id.in_(location_ids))
+    )).all() if location_ids else []
     
     if not prayer_times:
         raise HTTPException(status_code=404, detail=f"No prayer times found for city: {city}")
     
-    return prayer_times
+    return check_not_modified(request, response, prayer_times) or rows_response(response, prayer_times)
 
 # ✅ GET prayer times by country
 @router.get("/country/{country}", response_model=List[PrayerTimeResponse])
-def get_prayer_times_by_country(
+@query_budget(3)
+async def get_prayer_times_by_country(
     country: str, 
-    session: Session = Depends(get_session)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    # Join PrayerTime with Location to filter by country
-    prayer_times = session.exec(
-        select(PrayerTime)
-        .join(Location)
-        .where(Location.country.lower() == country.lower())
-    ).all()
+    # Resolve the normalized country name to location ids, then filter by location_id
+    location_ids = await location_names.country_ids(session, country)
+    if not location_ids:
+        raise HTTPException(status_code=404, detail=f"No prayer times found for country: {country}")
+    query = paginate(
+        select(*PRAYER_TIME_COLUMNS).where(PrayerTime.location_id.in_(location_ids)),
+        PrayerTime.id,
+        page
+    )
+    if page.format == "ndjson":
+        return stream_ndjson(query)
+
+    prayer_times = (await session.exec(query)).all()
     
-    if not prayer_times:
+    if not prayer_times and page.after_id is None:
         raise HTTPException(status_code=404, detail=f"No prayer times found for country: {country}")
     
-    return prayer_times
+    set_next_cursor(response, prayer_times, page)
+    return check_not_modified(request, response, prayer_times) or rows_response(response, prayer_times)
 
 # 🔐 CREATE Bulk Prayer Times (Admin Only)
-@router.post("/bulk", response_model=List[PrayerTime])
+@router.post("/bulk", response_model=List[PrayerTimeResponse])
 def create_bulk_prayer_times(
     prayer_times: List[BulkPrayerTimeCreate],
-    admin: User = Depends(require_role("admin")),
+    admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)
 ):
     try:
-        created_times = []
-        for prayer_time_data in prayer_times:
-            # 🔍 Step 1: Find Location ID by City
-            location = session.exec(select(Location).where(Location.city == prayer_time_data.city)).first()
-            if not location:
-                raise HTTPException(status_code=404, detail=f"City '{prayer_time_data.city}' not found")
-
-            # 🗓 Step 2: Parse Date Range (e.g., "1-10" → [1,2,3...10])
-            try:
-                start_day, end_day = map(int, prayer_time_data.date_range.split('-'))
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date_range format. Use 'start-end' (e.g., '1-10').")
-
-            # Generate Dates for the Given Month
-            bulk_dates = [date(2025, prayer_time_data.month, day) for day in range(start_day, end_day + 1)]
-
-            # 🔍 Step 3: Check for Existing Records
-            existing_records = session.exec(
-                select(PrayerTime).where(
-                    (PrayerTime.location_id == location.id) & 
-                    (PrayerTime.date.in_(bulk_dates))
-                )
-            ).all()
-
-            if existing_records:
-                raise HTTPException(status_code=409, detail="Some prayer times already exist. Operation aborted.")
-
-            # ✅ Step 4: Bulk Insert New Records
-            for prayer_date in bulk_dates:
-                new_prayer_time = PrayerTime(
-                    location_id=location.id,
-                    date=prayer_date,
-                    fajr=prayer_time_data.fajr,
-                    dhuhr=prayer_time_data.dhuhr,
-                    asr=prayer_time_data.asr,
-                    maghrib=prayer_time_data.maghrib,
-                    isha=prayer_time_data.isha,
-                    calculation_method=prayer_time_data.calculation_method
-                )
-                session.add(new_prayer_time)
-                created_times.append(new_prayer_time)
+        # 🔍 Step 1: Resolve Every City in One Query
+        locations = resolve_locations(session, (item.city for item in prayer_times))
+
+        # 🗓 Step 2: Validate Every Date Range Before Writing
+        ranges = validate_bulk_items(prayer_times, settings.PRAYER_BULK_MAX_DAYS)
+
+        # 🔎 Step 3: One Query for Existing Dates Across All Ranges
+        existing = existing_prayer_times(session, [
+            (locations[item.city].id, start, end) for item, (start, end) in zip(prayer_times, ranges)
+        ])
+        if existing:
+            sample = ", ".join(f"location {location_id} on {day}" for location_id, day in existing)
+            raise HTTPException(status_code=409, detail=f"Some prayer times already exist ({sample}). Operation aborted.")
+
+        # ✅ Step 4: Single Multi-Row Insert; Rows Added Meanwhile Are Skipped
+        rows, touched = bulk_create_rows(prayer_times, locations)
+        created_times = insert_prayer_times(session, rows)
+        if len(created_times) != len(rows):
+            raise HTTPException(status_code=409, detail="Some prayer times already exist. Operation aborted.")
 
         # 📝 Commit All Inserts
         session.commit()
-        for prayer_time in created_times:
-            session.refresh(prayer_time)
-
+        for location_id, start, end in touched:
+            invalidate_prayer_times(location_id, (start, end))
         return created_times
 
     except HTTPException as e:
@@ -197,65 +237,26 @@ def create_bulk_prayer_times(
 
 
 # 🔐 EDIT Bulk Prayer Times (Admin Only)
-@router.put("/bulk", response_model=List[PrayerTime])
+@router.put("/bulk", response_model=List[PrayerTimeResponse])
 def update_bulk_prayer_times(
     prayer_times: List[BulkPrayerTimeUpdate],
-    admin: User = Depends(require_role("admin")),
+    admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)
 ):
     try:
-        updated_times = []
-        for prayer_time_update in prayer_times:
-            # Find Location ID by City
-            location = session.exec(select(Location).where(Location.city == prayer_time_update.city)).first()
-            if not location:
-                raise HTTPException(status_code=404, detail=f"City '{prayer_time_update.city}' not found")
-
-            # Parse Date Range 
-            try:
-                start_day, end_day = map(int, prayer_time_update.date_range.split('-'))
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date_range format. Use 'start-end' (e.g., '1-10').")
-
-            # Generate Dates for the Given Month
-            bulk_dates = [date(2025, prayer_time_update.month, day) for day in range(start_day, end_day + 1)]
-
-            # Iterate Through Dates and Update or Create Records
-            for single_date in bulk_dates:
-                # Try to find existing record
-                existing_prayer = session.exec(
-                    select(PrayerTime).where(
-                        (PrayerTime.location_id == location.id) & 
-                        (PrayerTime.date == single_date)
-                    )
-                ).first()
-
-                # If no existing record, create a new one
-                if not existing_prayer:
-                    existing_prayer = PrayerTime(
-                        location_id=location.id,
-                        date=single_date
-                    )
-                    session.add(existing_prayer)
-
-                # Update prayer times
-                if prayer_time_update.fajr:
-                    existing_prayer.fajr = prayer_time_update.fajr
-                if prayer_time_update.dhuhr:
-                    existing_prayer.dhuhr = prayer_time_update.dhuhr
-                if prayer_time_update.asr:
-                    existing_prayer.asr = prayer_time_update.asr
-                if prayer_time_update.maghrib:
-                    existing_prayer.maghrib = prayer_time_update.maghrib
-                if prayer_time_update.isha:
-                    existing_prayer.isha = prayer_time_update.isha
-
-                updated_times.append(existing_prayer)
+        # Resolve Every City in One Query
+        locations = resolve_locations(session, (item.city for item in prayer_times))
+
+        # Validate Every Date Range Before Writing
+        validate_bulk_items(prayer_times, settings.PRAYER_BULK_MAX_DAYS)
+
+        # Upsert Complete Items, Update Partial Ones
+        updated_times, touched = apply_bulk_updates(session, prayer_times, locations)
 
         # Commit All Updates
         session.commit()
-        for prayer_time in updated_times:
-            session.refresh(prayer_time)
+        for location_id, start, end in touched:
+            invalidate_prayer_times(location_id, (start, end))
         return updated_times
 
     except HTTPException as e:
@@ -265,13 +266,40 @@ def update_bulk_prayer_times(
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# 🔐 QUEUE Bulk Prayer Time Creation as a Job (Admin Only)
+@router.post("/bulk/jobs", response_model=JobResponse, status_code=202)
+def create_bulk_prayer_times_job(
+    prayer_times: List[BulkPrayerTimeCreate],
+    response: Response,
+    admin: Claims = Depends(require_role("admin")),
+    session: Session = Depends(get_session)
+):
+    job = submit_job(session, CREATE_PRAYER_TIMES, prayer_times, created_by=admin.id)
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return job
+
+# 🔐 QUEUE Bulk Prayer Time Edits as a Job (Admin Only)
+@router.put("/bulk/jobs", response_model=JobResponse, status_code=202)
+def update_bulk_prayer_times_job(
+    prayer_times: List[BulkPrayerTimeUpdate],
+    response: Response,
+    admin: Claims = Depends(require_role("admin")),
+    session: Session = Depends(get_session)
+):
+    job = submit_job(session, UPDATE_PRAYER_TIMES, prayer_times, created_by=admin.id)
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return job
+
 # 🔐 DELETE Bulk Prayer Times (Admin Only)
-@router.delete("/bulk") 
+@router.delete("/bulk")
 def delete_bulk_prayer_times(
     city: str,
-    month: int,
-    date_range: str,
-    admin: User = Depends(require_role("admin")),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    month: Optional[int] = None,
+    date_range: Optional[str] = None,
+    year: Optional[int] = None,
+    admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)
 ):
     try:
@@ -280,31 +308,25 @@ def delete_bulk_prayer_times(
         if not location:
             raise HTTPException(status_code=404, detail=f"City '{city}' not found")
 
-        # Parse Date Range 
-        try:
-            start_day, end_day = map(int, date_range.split('-'))
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_range format. Use 'start-end' (e.g., '1-10').")
-
-        # Generate Dates for the Given Month
-        bulk_dates = [date(2025, month, day) for day in range(start_day, end_day + 1)]
-
-        # Find and Delete All Records
-        existing_prayers = session.exec(
-            select(PrayerTime).where(
-                (PrayerTime.location_id == location.id) & 
-                (PrayerTime.date.in_(bulk_dates))
+        # start_date/end_date, or the days of one month
+        start, end = day_range(start_date, end_date, month, date_range, year)
+
+        # Delete the Whole Range in One Statement
+        result = session.exec(
+            delete(PrayerTime).where(
+                (PrayerTime.location_id == location.id) &
+                (PrayerTime.date >= start) &
+                (PrayerTime.date <= end)
             )
-        ).all()
+        )
 
-        if not existing_prayers:
+        if not result.rowcount:
             raise HTTPException(status_code=404, detail="No prayer times found for the specified date range")
 
-        for prayer_time in existing_prayers:
-            session.delete(prayer_time)
         session.commit()
+        invalidate_prayer_times(location.id, (start, end))
 
-        return {"message": f"Deleted {len(existing_prayers)} prayer times"}
+        return {"message": f"Deleted {result.rowcount} prayer times"}
 
     except HTTPException as e:
         session.rollback()
@@ -313,50 +335,257 @@ def delete_bulk_prayer_times(
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# 🔐 GENERATE Prayer Times from Location Coordinates (Admin Only)
+@router.post("/generate")
+def generate_prayer_times(
+    request: PrayerTimeGenerate,
+    admin: Claims = Depends(require_role("admin")),
+    session: Session = Depends(get_session)
+):
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    # Imported on first use: numpy is not needed to start serving reads
+    from ....calculation import generate_timetable
+
+    try:
+        # 🔍 Step 1: Resolve Locations in One Query
+        query = select(Location)
+        if request.location_ids is not None:
+            query = query.where(Location.id.in_(request.location_ids))
+        locations = session.exec(query).all()
+
+        if request.location_ids is not None:
+            missing = set(request.location_ids) - {location.id for location in locations}
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Locations not found: {sorted(missing)}")
+        location_ids = [location.id for location in locations]
+
+        # 🔍 Step 2: Check or Clear Existing Records in the Range
+        in_range = (
+            PrayerTime.location_id.in_(location_ids),
+            PrayerTime.date >= request.start_date,
+            PrayerTime.date <= request.end_date
+        )
+        if request.overwrite:
+            session.exec(delete(PrayerTime).where(*in_range))
+        elif session.exec(select(PrayerTime.id).where(*in_range).limit(1)).first():
+            raise HTTPException(status_code=409, detail="Some prayer times already exist. Use overwrite to replace them.")
+
+        # 🧮 Step 3: Compute Every Location/Day in Batched Passes
+        rows = generate_timetable(locations, request.start_date, request.end_date)
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            row["created_at"] = now
+            row["updated_at"] = now
+
+        # ✅ Step 4: Insert with a Single executemany
+        if rows:
+            session.exec(insert(PrayerTime), params=rows)
+        session.commit()
+        for location_id in location_ids:
+            invalidate_prayer_times(location_id, [request.start_date, request.end_date])
+
+        return {"message": f"Generated {len(rows)} prayer times for {len(locations)} locations"}
+
+    except ValueError as e:
+        # Unknown timezone, or days the sun position cannot be computed for
+        session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as e:
+        session.rollback()
+        raise e
+    except Exception as e:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+# 🔐 Prayer Time Cache Statistics (Admin Only)
+@router.get("/cache")
+def get_prayer_cache_stats(admin: Claims = Depends(require_role("admin"))):
+    stats = prayer_cache.stats()
+    if settings.TIMETABLE_STORE:
+        stats["timetable"] = timetable_store.stats()
+    return stats
+
+# 🌐 Current and Next Prayer for a Location
+@router.get("/next", response_model=NextPrayerResponse)
+@query_budget(3)
+async def get_next_prayer(
+    location_id: int,
+    at: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Defaults to now; a naive `at` is taken as UTC
+    if at is None:
+        now = datetime.now(timezone.utc)
+    else:
+        now = at.replace(tzinfo=timezone.utc) if at.tzinfo is None else at.astimezone(timezone.utc)
+
+    cached = schedule_cache.get(location_id, now)
+    if cached is None:
+        generation = schedule_cache.generation(location_id)
+        location = await session.get(Location, location_id)
+        if not location:
+            raise HTTPException(status_code=404, detail="Location not found")
+
+        try:
+            zone = get_zone(location.timezone)
+        except ValueError as e:
+            # Stored before timezones were validated
+            raise HTTPException(status_code=400, detail=str(e))
+        start, end = schedule_cache.window(location.timezone, now)
+        prayer_times = None
+        if settings.TIMETABLE_STORE:
+            prayer_times = await timetable_store.rows(session, location_id, start, end)
+        if prayer_times is None:
+            prayer_times = (await session.exec(
+                select(*PRAYER_TIME_COLUMNS).where(
+                    PrayerTime.location_id == location_id,
+                    PrayerTime.date >= start,
+                    PrayerTime.date <= end
+                ).order_by(PrayerTime.date)
+            )).all()
+
+        schedule = build_schedule(prayer_times, zone, start, end)
+        schedule_cache.set(location_id, location.timezone, schedule, generation)
+        cached = (location.timezone, schedule)
+
+    timezone_name, schedule = cached
+    current, upcoming = locate(schedule, now)
+    if upcoming is None:
+        raise HTTPException(status_code=404, detail="No upcoming prayer times found for this location")
+
+    return NextPrayerResponse(
+        location_id=location_id,
+        timezone=timezone_name,
+        now=now,
+        current=current._asdict() if current else None,
+        next=upcoming._asdict(),
+        seconds_until_next=int((upcoming.at - now).total_seconds())
+    )
+
 # 🌐 View Single Prayer Time (Current Date/Specific Date)
 @router.get("/single", response_model=PrayerTimeResponse)
-def get_single_prayer_time(
+@query_budget(3)
+async def get_single_prayer_time(
+    request: Request,
     location_id: int,
     date: date = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     # If no date provided, use current date
     if date is None:
         date = datetime.now().date()
-    
-    prayer_time = session.exec(
-        select(PrayerTime)
-        .where(
-            PrayerTime.location_id == location_id,
-            PrayerTime.date == date
-        )
-    ).first()
-    
-    if not prayer_time:
-        raise HTTPException(status_code=404, detail="Prayer time not found")
-    
-    return prayer_time
+
+    cache_key = (location_id, date, date)
+    criteria = (
+        PrayerTime.location_id == location_id,
+        PrayerTime.date == date
+    )
+    return await cached_prayer_times(request, session, cache_key, criteria, single=True)
 
 # 🌐 View Multiple Prayer Times (Date Range)
 @router.get("/multiple", response_model=List[PrayerTimeResponse])
-def get_prayer_times_by_date_range(
+@query_budget(3)
+async def get_prayer_times_by_date_range(
+    request: Request,
     location_id: int,
     start_date: date,
     end_date: date,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    prayer_times = session.exec(
-        select(PrayerTime)
-        .where(
-            PrayerTime.location_id == location_id,
-            PrayerTime.date >= start_date,
-            PrayerTime.date <= end_date
-        )
-        .order_by(PrayerTime.date)
-    ).all()
-    
-    if not prayer_times:
-        raise HTTPException(status_code=404, detail="No prayer times found in the specified date range")
-    
-    return prayer_times
-
+    cache_key = (location_id, start_date, end_date)
+    criteria = (
+        PrayerTime.location_id == location_id,
+        PrayerTime.date >= start_date,
+        PrayerTime.date <= end_date
+    )
+    return await cached_prayer_times(request, session, cache_key, criteria)
+
+# 🌐 View Prayer Times for Many Locations / Date Ranges in One Query
+@router.post("/batch", response_model=List[PrayerTimeBatchResult])
+@query_budget(1)
+async def get_prayer_times_batch(
+    keys: List[PrayerTimeBatchKey],
+    session: AsyncSession = Depends(get_async_session)
+):
+    if len(keys) > settings.PRAYER_BATCH_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PRAYER_BATCH_MAX_KEYS} keys per batch")
+
+    # Each key is one day (`date`) or an inclusive range (`start_date`, `end_date`)
+    ranges = []
+    for index, key in enumerate(keys):
+        start_date = key.start_date or key.date
+        end_date = key.end_date or key.date
+        if start_date is None or end_date is None:
+            raise HTTPException(status_code=400, detail=f"Key {index}: give date, or start_date and end_date")
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail=f"Key {index}: end_date must not be before start_date")
+        ranges.append((key.location_id, start_date, end_date))
+    if sum((end_date - start_date).days + 1 for _, start_date, end_date in ranges) > settings.PRAYER_BATCH_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PRAYER_BATCH_MAX_DAYS} days per batch")
+
+    results = [
+        {"location_id": location_id, "start_date": start_date, "end_date": end_date, "prayer_times": []}
+        for location_id, start_date, end_date in ranges
+    ]
+    if ranges:
+        # One statement for every key, grouped back by the key's position
+        rows = (await session.exec(
+            batch_prayer_times_query(session.bind.dialect.name),
+            params={"keys": batch_keys_parameter(ranges)}
+        )).all()
+        fields = rows[0]._fields[1:] if rows else ()
+        for row in rows:
+            results[row[0]]["prayer_times"].append(dict(zip(fields, row[1:])))
+    return json_response(results)
+
+async def cached_prayer_times(request: Request, session: AsyncSession, cache_key, criteria, single: bool = False):
+    """Serve a location/date range from the cache, a 304, the timetable store or the database.
+
+    A conditional request that misses the cache and the store is answered
+    from an aggregate query first, so a 304 never loads or serializes rows.
+    """
+    route = "single" if single else "multiple"
+    key = (*cache_key, route)
+    cached = prayer_cache.get(key)
+    if cached is None:
+        generation = prayer_cache.generation(cache_key[0])
+        etag_key = "%s:%s:%s:%s" % (route, *cache_key)
+        prayer_times = None
+        if settings.TIMETABLE_STORE:
+            prayer_times = await timetable_store.rows(session, *cache_key)
+
+        if prayer_times is None:
+            if is_conditional(request):
+                validators = await query_validators(session, etag_key, PrayerTime, *criteria)
+                if is_not_modified(request, validators):
+                    return not_modified(validators)
+
+            prayer_times = (await session.exec(
+                select(*PRAYER_TIME_COLUMNS).where(*criteria).order_by(PrayerTime.date)
+            )).all()
+        if not prayer_times:
+            detail = "Prayer time not found" if single else "No prayer times found in the specified date range"
+            raise HTTPException(status_code=404, detail=detail)
+
+        body = encode_row(prayer_times[0]) if single else encode_rows(prayer_times)
+        cached = CachedResponse(body, validators_for_rows(etag_key, prayer_times), {})
+        prayer_cache.set(key, cached, generation)
+
+    if is_not_modified(request, cached.validators):
+        return not_modified(cached.validators)
+
+    # Compressed once per cached body and coding, then served as stored
+    headers = validator_headers(cached.validators)
+    body = cached.body
+    if compressible(len(body)):
+        headers["Vary"] = "Accept-Encoding"
+        encoding = pick_encoding(request.headers.get("accept-encoding", ""), ENCODINGS)
+        if encoding is not None:
+            body = cached.encodings.get(encoding) or prayer_cache.add_encoding(
+                key, cached, encoding, await compress_async(body, encoding)
+            )
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = weak_etag(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List
-from ....database import get_session
+from ....database import get_async_session, get_session, save
 from ....models.user import User
 from ....schemas.user import UserResponse, UserUpdate, UpdatePassword, AdminUserCreate
-from ....dependencies import get_current_user, require_role
+from ....dependencies import Claims, Principal, get_current_principal, get_current_user, invalidate_principal, require_role
+from ....pagination import PageParams, paginate, set_next_cursor, stream_ndjson
+from ....security import password_hasher
 
 router = APIRouter()
 
 # ✅ GET current user info
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: Principal = Depends(get_current_principal)):
     return current_user
 
 # ✅ UPDATE current user
@@ -20,6 +24,7 @@ def update_current_user(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
+    old_username = current_user.username
     if user_update.username:
         current_user.username = user_update.username
     if user_update.email:
@@ -28,14 +33,14 @@ def update_current_user(
     session.add(current_user)
     session.commit()
     session.refresh(current_user)
-    return 
+    invalidate_principal(old_username)
+    return current_user
 
 # ✅ UPDATE current user password
-@router.put("/me/password", response_model=UserResponse)
-def update_password(password_update: UpdatePassword, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    current_user.hashed_password = User.hash_password(password_update.password)
-    session.add(current_user)
-    session.commit()
+@router.put("/me/password")
+async def update_password(password_update: UpdatePassword, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    current_user.hashed_password = await password_hasher.hash(password_update.password)
+    await run_in_threadpool(save, session, current_user)
     return {"message": "Password updated successfully"}
 
 # ✅ DELETE current user
@@ -43,57 +48,65 @@ def update_password(password_update: UpdatePassword, current_user: User = Depend
 def delete_current_user(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     session.delete(current_user)
     session.commit()
+    invalidate_principal(current_user.username)
     return {"message": "User deleted successfully"}
 
 # ✅ GET all users (admin/panel) (Admin only)
 @router.get("/", response_model=List[UserResponse])
-def get_users(
-    admin: User = Depends(require_role("admin")),
-    session: Session = Depends(get_session)
+async def get_users(
+    response: Response,
+    page: PageParams = Depends(),
+    admin: Claims = Depends(require_role("admin")),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    return session.exec(select(User)).all()
+    query = paginate(select(User), User.id, page)
+    if page.format == "ndjson":
+        return stream_ndjson(query, UserResponse)
+
+    users = (await session.exec(query)).all()
+    set_next_cursor(response, users, page)
+    return users
 
 # ✅ GET a single user (admin/panel) (Admin only)
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, admin: User = Depends(require_role("admin")), session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+async def get_user(user_id: int, admin: Claims = Depends(require_role("admin")), session: AsyncSession = Depends(get_async_session)):
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 # ✅ CREATE a new user (admin/panel) (Admin only)
 @router.post("/", response_model=UserResponse)
-def create_user(
+async def create_user(
     user: AdminUserCreate,
-    admin: User = Depends(require_role("admin")),
-    session: Session = Depends(get_session)
+    admin: Claims = Depends(require_role("admin")),
+    session: Session = Depends(get_session),
+    reader: AsyncSession = Depends(get_async_session)
 ):
-    if session.exec(select(User).where(User.email == user.email)).first():
+    if (await reader.exec(select(User).where(User.email == user.email))).first():
         raise HTTPException(status_code=400, detail="Email already registered")
 
     new_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=User.hash_password(user.password),
+        hashed_password=await password_hasher.hash(user.password),
         role=user.role
     )
-    session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
-    return new_user
+    return await run_in_threadpool(save, session, new_user)
 
 # ✅ UPDATE an existing user (admin/panel) (Admin only)
 @router.put("/{user_id}", response_model=UserResponse)
 def update_user(
     user_id: int,
     user_update: UserUpdate,
-    admin: User = Depends(require_role("admin")),
+    admin: Claims = Depends(require_role("admin")),
     session: Session = Depends(get_session)
 ):
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    old_username = user.username
     if user_update.username:
         user.username = user_update.username
     if user_update.email:
@@ -104,14 +117,16 @@ def update_user(
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_principal(old_username)
     return user
 
 # ✅ CREATE a new user (admin/panel) (Admin only)
 @router.delete("/{user_id}")
-def delete_user(user_id: int, admin: User = Depends(require_role("admin")), session: Session = Depends(get_session)):
+def delete_user(user_id: int, admin: Claims = Depends(require_role("admin")), session: Session = Depends(get_session)):
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     session.delete(user)
     session.commit()
+    invalidate_principal(user.username)
     return {"message": "User deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+from .conditional import Validators
+from .config import get_settings
+from .generations import Generation, Generations
+from .schedule import schedule_cache
+from .timetable import timetable_store
+
+settings = get_settings()
+
+# (location_id, start_date, end_date, route)
+CacheKey = Tuple[int, date, date, str]
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    validators: Validators
+    encodings: Dict[str, bytes]  # content coding -> compressed body, filled on first use
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.encodings.values())
+
+class PrayerTimeCache:
+    """LRU cache of encoded prayer time responses with a TTL and a byte budget.
+
+    Entries are keyed by location, date range and route, so a write only
+    evicts the cached ranges of the locations and dates it touched. Each
+    entry also keeps the gzip/brotli bodies it has served, so a hit skips
+    the database, the encoder and the compressor. A miss takes the
+    location's `generation` before reading and `set` drops the response if
+    the location was invalidated meanwhile.
+    """
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._by_location: Dict[int, Set[CacheKey]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._generations = Generations()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, location_id: int) -> Generation:
+        return self._generations.get(location_id)
+
+    def set(self, key: CacheKey, response: CachedResponse, generation: Generation):
+        if response.size > self.max_bytes:
+            return
+        with self._lock:
+            if not self._generations.current(key[0], generation):
+                return  # read before a write to the location; the next miss reads again
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._by_location.setdefault(key[0], set()).add(key)
+            self._size += response.size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def add_encoding(self, key: CacheKey, response: CachedResponse, encoding: str, body: bytes) -> bytes:
+        """Keep a compressed copy of a cached response's body; returns `body`"""
+        with self._lock:
+            if encoding in response.encodings:
+                return response.encodings[encoding]
+            response.encodings[encoding] = body
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is response:
+                self._size += len(body)
+                while self._size > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+        return body
+
+    def invalidate(self, location_id: int, dates: Optional[Iterable[date]] = None):
+        """Drop a location's entries, or only those overlapping `dates`"""
+        dates = list(dates) if dates is not None else None
+        with self._lock:
+            self._generations.bump(location_id)
+            keys = self._by_location.get(location_id, set())
+            if dates:
+                first, last = min(dates), max(dates)
+                keys = {key for key in keys if key[1] <= last and key[2] >= first}
+            for key in list(keys):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generations.bump_all()
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_location.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: CacheKey):
+        _, response = self._entries.pop(key)
+        self._size -= response.size
+        keys = self._by_location.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_location[key[0]]
+
+prayer_cache = PrayerTimeCache(settings.PRAYER_CACHE_MAX_BYTES, settings.PRAYER_CACHE_TTL)
+
+def invalidate_prayer_times(location_id: int, dates: Optional[Iterable[date]] = None):
+    """Drop read-side copies of a location's prayer times after a write"""
+    prayer_cache.invalidate(location_id, dates)
+    timetable_store.invalidate(location_id)
+    schedule_cache.invalidate(location_id)
+
+def clear_prayer_times():
+    prayer_cache.clear()
+    timetable_store.clear()
+    schedule_cache.clear()
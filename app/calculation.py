@@ -0,0 +1,209 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+
+PRAYERS = ("fajr", "dhuhr", "asr", "maghrib", "isha")
+
+# Twilight parameters per calculation method. `isha` is a sun depression angle
+# unless `isha_minutes` is set, in which case isha is a fixed delay after maghrib.
+CALCULATION_METHODS: Dict[str, dict] = {
+    "MWL": {"name": "Muslim World League", "fajr": 18.0, "isha": 17.0},
+    "ISNA": {"name": "Islamic Society of North America", "fajr": 15.0, "isha": 15.0},
+    "Egypt": {"name": "Egyptian General Authority of Survey", "fajr": 19.5, "isha": 17.5},
+    "Makkah": {"name": "Umm Al-Qura University, Makkah", "fajr": 18.5, "isha_minutes": 90},
+    "Karachi": {"name": "University of Islamic Sciences, Karachi", "fajr": 18.0, "isha": 18.0},
+    "Tehran": {"name": "Institute of Geophysics, University of Tehran", "fajr": 17.7, "isha": 14.0, "maghrib": 4.5},
+    "Jafari": {"name": "Shia Ithna-Ashari, Leva Institute, Qum", "fajr": 16.0, "isha": 14.0, "maghrib": 4.0},
+}
+DEFAULT_METHOD = "MWL"
+
+# Shadow length factor used for asr
+ASR_FACTORS = {"standard": 1.0, "hanafi": 2.0}
+
+SUNRISE_ANGLE = 0.833
+# Highest latitude at which the sun rises and sets on every day of the year
+HIGH_LATITUDE = 65.0
+
+def julian_days(dates: Sequence[date]) -> np.ndarray:
+    """Julian day number at 00:00 UTC for each date"""
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.float64, count=len(dates))
+    # date(2000, 1, 1).toordinal() == 730120, JD 2451544.5
+    return ordinals - 730120 + 2451544.5
+
+def sun_position(jd: np.ndarray):
+    """Solar declination (degrees) and equation of time (hours) for each julian day"""
+    d = jd - 2451545.0
+    g = np.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    lam = np.radians((q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360)
+    e = np.radians(23.439 - 0.00000036 * d)
+
+    ra = np.degrees(np.arctan2(np.cos(e) * np.sin(lam), np.cos(lam))) / 15 % 24
+    declination = np.degrees(np.arcsin(np.sin(e) * np.sin(lam)))
+    equation = q / 15 - ra
+    equation = (equation + 12) % 24 - 12
+    return declination, equation
+
+def _cos_hour_angle(angle, lat, decl):
+    return (-np.sin(np.radians(angle)) - np.sin(decl) * np.sin(lat)) / (np.cos(decl) * np.cos(lat))
+
+def _hour_angle(angle, lat, decl):
+    """Hours between solar noon and the moment the sun is `angle` degrees below
+    the horizon. NaN where the sun never reaches that depression."""
+    with np.errstate(invalid="ignore"):
+        return np.degrees(np.arccos(_cos_hour_angle(angle, lat, decl))) / 15
+
+def _solar_latitude(lat, decl):
+    """`lat`, or ±HIGH_LATITUDE on days the sun does not rise and set there.
+
+    Nearest latitude rule: on days of midnight sun or polar night, sunrise,
+    sunset, maghrib and asr are those of the nearest latitude where the sun
+    rises and sets (with a positive noon altitude) every day of the year.
+    """
+    cos_h = _cos_hour_angle(SUNRISE_ANGLE, lat, decl)
+    normal = (np.abs(cos_h) <= 1) & (np.abs(lat - decl) < np.pi / 2)
+    return np.where(normal, lat, np.copysign(np.radians(HIGH_LATITUDE), lat))
+
+def _asr_hour_angle(factor, lat, decl):
+    altitude = np.arctan(1 / (factor + np.tan(np.abs(lat - decl))))
+    cos_h = (np.sin(altitude) - np.sin(decl) * np.sin(lat)) / (np.cos(decl) * np.cos(lat))
+    with np.errstate(invalid="ignore"):
+        return np.degrees(np.arccos(cos_h)) / 15
+
+def compute_times(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    dates: Sequence[date],
+    method: str = DEFAULT_METHOD,
+    asr_juristic: str = "standard",
+) -> Dict[str, np.ndarray]:
+    """Compute prayer times in UTC hours for every location/date pair.
+
+    Returns a mapping of prayer name to an array of shape
+    (len(latitudes), len(dates)). Values may fall outside [0, 24) and are
+    only wrapped when converted to local clock times.
+    """
+    if method not in CALCULATION_METHODS:
+        raise ValueError(f"Unknown calculation method '{method}'")
+    params = CALCULATION_METHODS[method]
+
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None]
+    lon = np.asarray(longitudes, dtype=np.float64)[:, None]
+    # Sun position at solar noon is accurate enough for all five prayers
+    decl, eqt = sun_position(julian_days(dates) + 0.5)
+    decl = np.radians(decl)[None, :]
+
+    dhuhr = 12 - lon / 15 - eqt[None, :]
+    solar_lat = _solar_latitude(lat, decl)
+    sunrise_angle = _hour_angle(SUNRISE_ANGLE, solar_lat, decl)
+    sunrise = dhuhr - sunrise_angle
+    sunset = dhuhr + sunrise_angle
+    fajr = dhuhr - _hour_angle(params["fajr"], lat, decl)
+    asr = dhuhr + _asr_hour_angle(ASR_FACTORS[asr_juristic], solar_lat, decl)
+
+    if "maghrib" in params:
+        # Where the sun sets but never sinks to the maghrib angle, maghrib is at sunset
+        maghrib = dhuhr + _hour_angle(params["maghrib"], solar_lat, decl)
+        maghrib = np.where(np.isnan(maghrib), sunset, maghrib)
+    else:
+        maghrib = sunset
+    if "isha_minutes" in params:
+        isha = maghrib + params["isha_minutes"] / 60
+    else:
+        isha = dhuhr + _hour_angle(params["isha"], lat, decl)
+
+    # High latitudes: sunrise, sunset, maghrib and asr follow _solar_latitude.
+    # When twilight never ends (or is unreasonably long), cap fajr/isha at a
+    # portion of the night proportional to the angle; the same goes for
+    # fajr/isha that would fall after sunrise / before maghrib.
+    night = 24 - (sunset - sunrise)
+    fajr_portion = params["fajr"] / 60 * night
+    fajr = np.where(
+        np.isnan(fajr) | (fajr > sunrise) | (sunrise - fajr > fajr_portion), sunrise - fajr_portion, fajr
+    )
+    if "isha_minutes" not in params:
+        isha_portion = params["isha"] / 60 * night
+        isha = np.where(np.isnan(isha) | (isha - sunset > isha_portion), sunset + isha_portion, isha)
+        isha = np.where(isha < maghrib, maghrib + isha_portion, isha)
+
+    dhuhr = np.broadcast_to(dhuhr, fajr.shape)
+    return {"fajr": fajr, "dhuhr": dhuhr, "asr": asr, "maghrib": maghrib, "isha": isha}
+
+def utc_offsets(timezones: Sequence[str], dates: Sequence[date]) -> np.ndarray:
+    """UTC offset in hours at local noon, shape (len(timezones), len(dates)).
+
+    Offsets are only resolved once per distinct timezone, so thousands of
+    locations sharing a handful of zones cost a handful of lookups per day.
+    """
+    unique, inverse = np.unique(np.asarray(timezones, dtype=object).astype(str), return_inverse=True)
+    table = np.empty((len(unique), len(dates)), dtype=np.float64)
+    for i, name in enumerate(unique):
+        try:
+            zone = ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone '{name}'")
+        table[i] = [
+            datetime.combine(d, time(12), zone).utcoffset().total_seconds() / 3600
+            for d in dates
+        ]
+    return table[inverse]
+
+def to_local_minutes(hours_utc: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Convert UTC hours to whole minutes after local midnight"""
+    minutes = np.rint((hours_utc + offsets) * 60)
+    return (minutes % 1440).astype(np.int32)
+
+def date_range(start_date: date, end_date: date) -> List[date]:
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+def generate_timetable(locations: Iterable, start_date: date, end_date: date) -> List[dict]:
+    """Build `prayer_times` rows for every location between two dates (inclusive).
+
+    Locations are grouped by calculation method so each group is computed in
+    a single vectorized pass over all of its locations and days. Raises
+    ValueError for an unknown timezone or a day that cannot be computed.
+    """
+    locations = list(locations)
+    dates = date_range(start_date, end_date)
+    if not locations or not dates:
+        return []
+
+    groups: Dict[str, list] = {}
+    for location in locations:
+        groups.setdefault(location.calculation_method or DEFAULT_METHOD, []).append(location)
+
+    clock = [time(m // 60, m % 60) for m in range(1440)]
+    rows = []
+    for method, group in groups.items():
+        times = compute_times(
+            [loc.latitude for loc in group],
+            [loc.longitude for loc in group],
+            dates,
+            method=method,
+        )
+        failed = ~np.logical_and.reduce([np.isfinite(times[name]) for name in PRAYERS])
+        if failed.any():
+            i = int(np.argmax(failed.any(axis=1)))
+            days = [str(day) for day, bad in zip(dates, failed[i]) if bad]
+            raise ValueError(
+                f"Cannot compute prayer times for location {group[i].id} ({group[i].city}) on {', '.join(days[:5])}"
+                + (f" and {len(days) - 5} more days" if len(days) > 5 else "")
+            )
+        offsets = utc_offsets([loc.timezone for loc in group], dates)
+        local = {name: to_local_minutes(times[name], offsets).tolist() for name in PRAYERS}
+
+        for i, location in enumerate(group):
+            fajr, dhuhr, asr, maghrib, isha = (local[name][i] for name in PRAYERS)
+            for j, day in enumerate(dates):
+                rows.append({
+                    "location_id": location.id,
+                    "date": day,
+                    "fajr": clock[fajr[j]],
+                    "dhuhr": clock[dhuhr[j]],
+                    "asr": clock[asr[j]],
+                    "maghrib": clock[maghrib[j]],
+                    "isha": clock[isha[j]],
+                    "calculation_method": method,
+                })
+    return rows
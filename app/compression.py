@@ -0,0 +1,145 @@
+import zlib
+from typing import Dict, Iterable, Optional
+import brotli
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .conditional import weak_etag
+from .config import get_settings
+
+settings = get_settings()
+
+# Content codings we produce, most preferred first
+ENCODINGS = ("br", "gzip")
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+# Larger bodies are compressed on a worker thread (zlib and brotli release the GIL)
+THREADPOOL_MIN_BYTES = 32 * 1024
+
+def pick_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """The available coding the client weights highest (ties go to the first available)"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+class Compressor:
+    """Incremental gzip or brotli stream; every chunk is flushed so streamed responses keep flowing"""
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._stream = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        else:
+            # wbits 16 + 15: deflate in a gzip container
+            self._stream = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        if self.encoding == "br":
+            output = self._stream.process(data)
+            return output + (self._stream.finish() if final else self._stream.flush())
+        output = self._stream.compress(data)
+        return output + self._stream.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    async def compress_async(self, data: bytes, final: bool = False) -> bytes:
+        """compress, off the event loop for large chunks"""
+        if len(data) >= THREADPOOL_MIN_BYTES:
+            return await run_in_threadpool(self.compress, data, final)
+        return self.compress(data, final)
+
+def compress(body: bytes, encoding: str) -> bytes:
+    return Compressor(encoding).compress(body, final=True)
+
+async def compress_async(body: bytes, encoding: str) -> bytes:
+    """compress, off the event loop for large bodies"""
+    return await Compressor(encoding).compress_async(body, final=True)
+
+def compressible(size: int) -> bool:
+    return settings.RESPONSE_COMPRESSION and size >= settings.COMPRESSION_MIN_SIZE
+
+class CompressionMiddleware:
+    """gzip or brotli per `Accept-Encoding` for responses of at least `minimum_size` bytes.
+
+    Like Starlette's GZipMiddleware, with brotli preferred when the client
+    accepts it. Streamed bodies are compressed chunk by chunk, and bodies or
+    chunks of THREADPOOL_MIN_BYTES or more on a worker thread, so a large
+    list response does not stall the event loop. Responses that
+    already carry Content-Encoding (the compressed prayer time cache)
+    pass through untouched. Compressed bodies differ byte for byte from the
+    identity one, so their ETag is made weak, and so is a 304's.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = pick_encoding(Headers(scope=scope).get("accept-encoding", ""), ENCODINGS)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[Compressor] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body chunk decides
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    if start["status"] == 304 and "etag" in headers:
+                        # The stored response it revalidates may be compressed
+                        headers["ETag"] = weak_etag(headers["etag"])
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                body = await compressor.compress_async(body, final=not more_body)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = weak_etag(headers["etag"])
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+                await send({**message, "body": body})
+                return
+
+            if compressor is not None:
+                message = {**message, "body": await compressor.compress_async(body, final=not more_body)}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
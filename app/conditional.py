@@ -0,0 +1,84 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional, Sequence
+from fastapi import Request, Response
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+def make_validators(key: str, count: int, last_modified: Optional[datetime], max_id: Optional[int]) -> Validators:
+    """Strong ETag over the row count, newest updated_at and highest id.
+
+    Any insert, update or delete in the result set changes at least one of
+    the three, and the same rows always serialize to the same body.
+    """
+    stamp = last_modified.isoformat() if last_modified else ""
+    digest = hashlib.sha1(f"{key}|{count}|{stamp}|{max_id}".encode()).hexdigest()
+    return Validators(f'"{digest}"', last_modified)
+
+def validators_for_rows(key: str, rows: Sequence) -> Validators:
+    if not rows:
+        return make_validators(key, 0, None, None)
+    return make_validators(
+        key,
+        len(rows),
+        max(row.updated_at for row in rows),
+        max(row.id for row in rows)
+    )
+
+async def query_validators(session: AsyncSession, key: str, model, *criteria) -> Validators:
+    """Validators for `SELECT ... WHERE criteria` from one aggregate query, without loading rows"""
+    count, last_modified, max_id = (await session.exec(
+        select(func.count(model.id), func.max(model.updated_at), func.max(model.id)).where(*criteria)
+    )).one()
+    return make_validators(key, count, last_modified, max_id)
+
+def weak_etag(etag: str) -> str:
+    """W/ form of an ETag, for representations that are not byte-identical (e.g. compressed ones)"""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: a tag matches whether or not either side is W/ (compressed)
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or validators.etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(validators.last_modified).replace(microsecond=0) <= since
+    return False
+
+def validator_headers(validators: Validators) -> dict:
+    headers = {"ETag": validators.etag}
+    if validators.last_modified:
+        headers["Last-Modified"] = format_datetime(_as_utc(validators.last_modified), usegmt=True)
+    return headers
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status_code=304, headers=validator_headers(validators))
+
+def check_not_modified(request: Request, response: Response, rows: Sequence) -> Optional[Response]:
+    """304 for already-loaded rows, or None after setting validator headers on `response`"""
+    validators = validators_for_rows(f"{request.url.path}?{request.url.query}", rows)
+    if is_not_modified(request, validators):
+        return not_modified(validators)
+    response.headers.update(validator_headers(validators))
+    return None
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are written in UTC but SQLite hands them back naive
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
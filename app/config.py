@@ -1,12 +1,105 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # e.g. postgresql+psycopg://...
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # SQLite connection profile, applied on connect to SQLite databases only
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # bytes
+    SQLITE_CACHE_SIZE: int = -65536  # negative values are KiB
+    SQLITE_BUSY_TIMEOUT: int = 5000  # milliseconds
+    SQLITE_WRITER_POOL_SIZE: int = 8  # writer connections; writes still run one at a time
+
+    # Seconds to wait for a writer connection, and on SQLite for the write
+    # lock, before answering 503
+    WRITER_TIMEOUT: float = 2.0
+
+    # In-process cache for /prayers/single and /prayers/multiple
+    PRAYER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    PRAYER_CACHE_TTL: int = 3600  # seconds
+
+    # gzip/brotli for responses of at least COMPRESSION_MIN_SIZE bytes; the
+    # prayer time cache keeps the compressed bodies it has served
+    RESPONSE_COMPRESSION: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # Serve /prayers/single and /prayers/multiple from packed in-memory timetables
+    TIMETABLE_STORE: bool = False
+    TIMETABLE_STORE_TTL: int = 3600  # seconds
+
+    # POST /prayers/batch limits per request
+    PRAYER_BATCH_MAX_KEYS: int = 5000
+    PRAYER_BATCH_MAX_DAYS: int = 50000  # sum of days over all keys
+
+    # Days per synchronous /prayers/bulk request, summed over its items
+    PRAYER_BULK_MAX_DAYS: int = 100000
+
+    # Asynchronous bulk jobs (/prayers/bulk/jobs), applied by a runner in each
+    # worker one chunk of items per transaction
+    JOBS_ENABLED: bool = True
+    JOB_MAX_ITEMS: int = 100000
+    JOB_CHUNK_ITEMS: int = 100
+    JOB_CHUNK_PAUSE: float = 0.02  # seconds between chunks, for other writers
+    JOB_LEASE_SECONDS: int = 60  # a job whose runner stops renewing is picked up again
+    JOB_POLL_INTERVAL: float = 2.0  # seconds; submissions on the same worker start at once
+    JOB_MAX_ERRORS: int = 1000  # stored per job; error_count keeps the total
+
+    # /prayers/next: local days per cached schedule and how long it is reused
+    SCHEDULE_DAYS: int = 7
+    SCHEDULE_CACHE_TTL: int = 3600  # seconds
+
+    # How long a verified user is trusted without a users lookup
+    PRINCIPAL_CACHE_TTL: int = 30  # seconds
+
+    # How long the city/country name → location map is reused
+    LOCATION_NAME_INDEX_TTL: int = 300  # seconds
+    # How long /locations/nearest trusts its in-memory index before reloading
+    NEAREST_INDEX_TTL: int = 300  # seconds
+
+    # Password hashing: stored hashes with a different cost are rehashed on login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # processes
+    PASSWORD_HASH_MAX_PENDING: int = 32  # queued + running before 503
+
+    # Prometheus metrics at /metrics and per-request SQL accounting
+    METRICS_ENABLED: bool = True
+
+    # Per-request SQL checks for development and CI: "off", "warn" (log and
+    # X-Query-* headers) or "strict" (also 500 when a route is over budget)
+    QUERY_INSPECTION: str = "off"
+    QUERY_REPEAT_THRESHOLD: int = 5  # same statement this often is flagged as N+1
+    QUERY_BUDGET_DEFAULT: Optional[int] = None  # for routes without @query_budget
+
+    # Admission control per route class (reads, admin writes, auth): requests
+    # beyond concurrency + queue, or waiting past the timeout, get 503
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_READ_CONCURRENCY: int = 64
+    ADMISSION_READ_QUEUE: int = 256
+    ADMISSION_WRITE_CONCURRENCY: int = 4
+    ADMISSION_WRITE_QUEUE: int = 16
+    ADMISSION_AUTH_CONCURRENCY: int = 8
+    ADMISSION_AUTH_QUEUE: int = 32
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0  # seconds
+    ADMISSION_RETRY_AFTER: int = 1  # seconds
+
+    # Per-client token buckets (429 when empty); a rate of 0 disables the limit
+    RATE_LIMIT_READ_PER_SECOND: float = 0
+    RATE_LIMIT_READ_BURST: int = 100
+    RATE_LIMIT_WRITE_PER_SECOND: float = 0
+    RATE_LIMIT_WRITE_BURST: int = 20
+    RATE_LIMIT_AUTH_PER_SECOND: float = 0
+    RATE_LIMIT_AUTH_BURST: int = 10
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # key clients by X-Forwarded-For (behind a proxy only)
+
     class Config:
         env_file = ".env"
 
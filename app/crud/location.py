@@ -0,0 +1,62 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..config import get_settings
+from ..models.location import Location, normalize_name
+from ..schemas.location import LocationResponse
+from ..serialization import response_columns
+
+settings = get_settings()
+
+LOCATION_COLUMNS = response_columns(Location, LocationResponse)
+
+# (city_key → ids, country_key → ids)
+NameMaps = Tuple[Dict[str, List[int]], Dict[str, List[int]]]
+
+class LocationNameIndex:
+    """In-memory normalized city/country name → location ids.
+
+    Loaded from the locations table on first use and rebuilt after a local
+    location write or LOCATION_NAME_INDEX_TTL. Names the map does not know
+    fall back to an index seek on the key columns, so locations created on
+    another worker are found before the map expires.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._maps: Optional[Tuple[float, NameMaps]] = None
+
+    async def _get_maps(self, session: AsyncSession) -> NameMaps:
+        entry = self._maps
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        cities: Dict[str, List[int]] = {}
+        countries: Dict[str, List[int]] = {}
+        rows = (await session.exec(select(Location.id, Location.city_key, Location.country_key))).all()
+        for location_id, city_key, country_key in rows:
+            cities.setdefault(city_key, []).append(location_id)
+            countries.setdefault(country_key, []).append(location_id)
+        self._maps = (time.monotonic() + self.ttl, (cities, countries))
+        return cities, countries
+
+    async def _lookup(self, session: AsyncSession, name: str, by_country: bool) -> List[int]:
+        key = normalize_name(name)
+        cities, countries = await self._get_maps(session)
+        ids = (countries if by_country else cities).get(key)
+        if ids is not None:
+            return ids
+
+        column = Location.country_key if by_country else Location.city_key
+        return list((await session.exec(select(Location.id).where(column == key))).all())
+
+    async def city_ids(self, session: AsyncSession, city: str) -> List[int]:
+        return await self._lookup(session, city, by_country=False)
+
+    async def country_ids(self, session: AsyncSession, country: str) -> List[int]:
+        return await self._lookup(session, country, by_country=True)
+
+    def invalidate(self):
+        self._maps = None
+
+location_names = LocationNameIndex(settings.LOCATION_NAME_INDEX_TTL)
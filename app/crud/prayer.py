@@ -0,0 +1,423 @@
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import Date, Integer, RowMapping, String, and_, bindparam, cast, column, func, literal_column, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlmodel import Session, select, update
+from ..models.location import Location
+from ..models.prayer import PrayerTime
+from ..schemas.prayer import BulkPrayerTimeCreate, BulkPrayerTimeUpdate, PrayerTimeResponse
+from ..serialization import response_columns
+
+PRAYER_FIELDS = ("fajr", "dhuhr", "asr", "maghrib", "isha")
+
+# Read routes select these columns instead of PrayerTime entities and encode
+# the rows directly; response_model only documents the shape.
+PRAYER_TIME_COLUMNS = response_columns(PrayerTime, PrayerTimeResponse)
+
+# Core table: bulk statements skip ORM identity-map bookkeeping per row
+prayer_times = PrayerTime.__table__
+
+def _dialect_insert(session: Session):
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "mysql":
+        return mysql.insert
+    raise NotImplementedError(f"Upserts are not supported on '{dialect}'")
+
+def _skip_conflicts(stmt):
+    """Leave existing (location_id, date) rows alone"""
+    if isinstance(stmt, mysql.Insert):
+        return stmt.prefix_with("IGNORE")
+    return stmt.on_conflict_do_nothing(index_elements=["location_id", "date"])
+
+def _update_conflicts(stmt, fields: Sequence[str]):
+    """Overwrite `fields` of existing (location_id, date) rows"""
+    if isinstance(stmt, mysql.Insert):
+        return stmt.on_duplicate_key_update({field: stmt.inserted[field] for field in fields})
+    return stmt.on_conflict_do_update(
+        index_elements=["location_id", "date"],
+        set_={field: stmt.excluded[field] for field in fields}
+    )
+
+def _write_time(session: Session) -> datetime:
+    """created_at/updated_at for a write; whole seconds on MySQL, whose DATETIME rounds fractions"""
+    now = datetime.now(timezone.utc)
+    if session.get_bind().dialect.name == "mysql":
+        now = now.replace(microsecond=0)
+    return now
+
+def _execute_returning(session: Session, stmt, values: List[dict], rows: Sequence[dict], now: datetime) -> List[RowMapping]:
+    """Run an insert/upsert of `rows` (bound as `values`) and return the rows it wrote.
+
+    Without INSERT ... RETURNING (MySQL), the rows are read back in one
+    query: those of the written keys whose updated_at is this write's.
+    """
+    if session.get_bind().dialect.insert_returning:
+        return session.execute(stmt.returning(*prayer_times.c), values).mappings().all()
+    session.execute(stmt, values)
+    return session.execute(
+        written_prayer_times_query(session.get_bind().dialect.name),
+        {"keys": batch_keys_parameter(_date_ranges(rows)), "updated_at": now}
+    ).mappings().all()
+
+def _date_ranges(rows: Iterable[dict]) -> List[Tuple[int, date, date]]:
+    """The rows' (location_id, date) keys as (location_id, start, end) runs of consecutive days"""
+    ranges = []
+    for location_id, day in sorted({(row["location_id"], row["date"]) for row in rows}):
+        if ranges and ranges[-1][0] == location_id and ranges[-1][2] + timedelta(days=1) == day:
+            ranges[-1] = (location_id, ranges[-1][1], day)
+        else:
+            ranges.append((location_id, day, day))
+    return ranges
+
+def _insert_statement(session: Session, values: List[dict]):
+    """Dialect insert for `values`, pre-rendering repeated values on SQLite.
+
+    SQLite stores dates and times as text, and SQLAlchemy formats every
+    value of every row. Bulk payloads repeat a handful of times and one
+    timestamp across thousands of rows, so each distinct value is rendered
+    once and bound as a plain string.
+    """
+    insert = _dialect_insert(session)
+    if insert is not sqlite.insert:
+        return insert(prayer_times), values
+
+    dialect = session.get_bind().dialect
+    processors = {}
+    for column in prayer_times.c:
+        processor = column.type.dialect_impl(dialect).bind_processor(dialect)
+        if processor and column.name in values[0]:
+            processors[column.name] = (processor, {})
+
+    for row in values:
+        for name, (processor, rendered) in processors.items():
+            value = row[name]
+            if value not in rendered:
+                rendered[value] = processor(value)
+            row[name] = rendered[value]
+
+    stmt = insert(prayer_times).values({
+        name: bindparam(name, type_=String()) for name in processors
+    })
+    return stmt, values
+
+def find_locations(session: Session, cities: Iterable[str]) -> Dict[str, Location]:
+    """Look up every city in one query; unknown cities are left out"""
+    cities = list(dict.fromkeys(cities))
+    locations = session.exec(select(Location).where(Location.city.in_(cities))).all()
+    return {location.city: location for location in locations}
+
+def resolve_locations(session: Session, cities: Iterable[str]) -> Dict[str, Location]:
+    """Look up every city in one query, raising 404 for the first unknown one"""
+    cities = list(dict.fromkeys(cities))
+    by_city = find_locations(session, cities)
+    for city in cities:
+        if city not in by_city:
+            raise HTTPException(status_code=404, detail=f"City '{city}' not found")
+    return by_city
+
+def day_range(start_date: Optional[date], end_date: Optional[date], month: Optional[int] = None,
+              date_range: Optional[str] = None, year: Optional[int] = None) -> Tuple[date, date]:
+    """Inclusive range from start_date/end_date, or a "start-end" day range (e.g. "1-10") of a month"""
+    if start_date is not None or end_date is not None:
+        if start_date is None or end_date is None:
+            raise HTTPException(status_code=400, detail="Give both start_date and end_date")
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        return start_date, end_date
+
+    if month is None or date_range is None:
+        raise HTTPException(status_code=400, detail="Give start_date and end_date, or month and date_range")
+    try:
+        start_day, end_day = map(int, date_range.split('-'))
+        year = year or date.today().year
+        start, end = date(year, month, start_day), date(year, month, end_day)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date_range format. Use 'start-end' (e.g., '1-10').")
+    if end < start:
+        raise HTTPException(status_code=400, detail="date_range must not end before it starts")
+    return start, end
+
+def item_day_range(item) -> Tuple[date, date]:
+    return day_range(item.start_date, item.end_date, item.month, item.date_range, item.year)
+
+def day_count(start: date, end: date) -> int:
+    return (end - start).days + 1
+
+def validate_bulk_items(items: Sequence, max_days: Optional[int] = None) -> List[Tuple[date, date]]:
+    """Each bulk item's range, after checking the whole payload before anything is written.
+
+    Rejects per-day time arrays whose length does not match their range,
+    items for the same city whose ranges overlap, and more than `max_days`
+    days in total.
+    """
+    ranges = []
+    for index, item in enumerate(items):
+        try:
+            start, end = item_day_range(item)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Item {index}: {e.detail}")
+        days = day_count(start, end)
+        for field in PRAYER_FIELDS:
+            times = getattr(item, field)
+            if isinstance(times, list) and len(times) != days:
+                raise HTTPException(status_code=400, detail=f"Item {index}: {field} has {len(times)} times for {days} days")
+        ranges.append((start, end))
+
+    if max_days is not None and sum(day_count(start, end) for start, end in ranges) > max_days:
+        raise HTTPException(status_code=400, detail=f"At most {max_days} days per request; queue larger loads as a job")
+
+    by_city: Dict[str, List[Tuple[date, date, int]]] = {}
+    for index, (item, (start, end)) in enumerate(zip(items, ranges)):
+        by_city.setdefault(item.city, []).append((start, end, index))
+    for city, spans in by_city.items():
+        spans.sort()
+        for (_, previous_end, previous), (start, _, index) in zip(spans, spans[1:]):
+            if start <= previous_end:
+                first, second = sorted((previous, index))
+                raise HTTPException(status_code=400, detail=f"Items {first} and {second} overlap for city '{city}'")
+    return ranges
+
+def _day_values(item, fields: Sequence[str], start: date, end: date) -> Iterator[Tuple[date, dict]]:
+    """(date, {field: time}) for each day of the range, taking per-day times from arrays"""
+    scalars, arrays = {}, {}
+    for field in fields:
+        times = getattr(item, field)
+        if isinstance(times, list):
+            arrays[field] = times
+        elif times is not None:
+            scalars[field] = times
+    for offset in range(day_count(start, end)):
+        values = dict(scalars)
+        for field, times in arrays.items():
+            values[field] = times[offset]
+        yield start + timedelta(days=offset), values
+
+def bulk_create_rows(items: Sequence[BulkPrayerTimeCreate], locations: Dict[str, Location]) -> Tuple[List[dict], List[Tuple[int, date, date]]]:
+    """Expand bulk create items into one row per day, plus the (location_id, start, end) each touches"""
+    rows = []
+    touched = []
+    for item in items:
+        location = locations[item.city]
+        start, end = item_day_range(item)
+        touched.append((location.id, start, end))
+        for prayer_date, values in _day_values(item, PRAYER_FIELDS, start, end):
+            rows.append({
+                **values,
+                "location_id": location.id,
+                "date": prayer_date,
+                "calculation_method": item.calculation_method
+            })
+    return rows, touched
+
+def apply_bulk_updates(session: Session, items: Sequence[BulkPrayerTimeUpdate], locations: Dict[str, Location]) -> Tuple[List, List[Tuple[int, date, date]]]:
+    """Apply bulk update items, returning the written rows and the (location_id, start, end) touched.
+
+    Items giving all five times update or create each date in one upsert.
+    Partial changes update existing dates with one executemany per set of
+    changed fields (a range predicate for single times, one row per day
+    for per-day arrays), then the changed ranges are read back in one query.
+    """
+    upsert_rows = []
+    range_updates: Dict[Tuple[str, ...], List[dict]] = {}
+    day_updates: Dict[Tuple[str, ...], List[dict]] = {}
+    partial_ranges = []
+    touched = []
+    for item in items:
+        location = locations[item.city]
+        start, end = item_day_range(item)
+        touched.append((location.id, start, end))
+        fields = tuple(field for field in PRAYER_FIELDS if getattr(item, field) is not None)
+
+        if len(fields) == len(PRAYER_FIELDS):
+            upsert_rows.extend(
+                {
+                    **values,
+                    "location_id": location.id,
+                    "date": prayer_date,
+                    "calculation_method": location.calculation_method
+                }
+                for prayer_date, values in _day_values(item, fields, start, end)
+            )
+        elif any(isinstance(getattr(item, field), list) for field in fields):
+            day_updates.setdefault(fields, []).extend(
+                {"b_location_id": location.id, "b_date": prayer_date, **{f"b_{field}": value for field, value in values.items()}}
+                for prayer_date, values in _day_values(item, fields, start, end)
+            )
+            partial_ranges.append((location.id, start, end))
+        elif fields:
+            range_updates.setdefault(fields, []).append({
+                "b_location_id": location.id, "b_start": start, "b_end": end,
+                **{f"b_{field}": getattr(item, field) for field in fields}
+            })
+            partial_ranges.append((location.id, start, end))
+
+    updated_times = list(upsert_prayer_times(session, upsert_rows))
+    if partial_ranges:
+        update_prayer_times(session, range_updates, day_updates)
+        rows = session.execute(
+            batch_prayer_times_query(session.get_bind().dialect.name),
+            {"keys": batch_keys_parameter(partial_ranges)}
+        ).all()
+        updated_times.extend(row._mapping for row in rows)
+    return updated_times, touched
+
+def existing_prayer_times(session: Session, ranges: Sequence[Tuple[int, date, date]], limit: int = 5) -> List[Tuple[int, date]]:
+    """Up to `limit` stored (location_id, date) inside any of `ranges`, with one query"""
+    if not ranges:
+        return []
+    return [tuple(row) for row in session.execute(
+        existing_prayer_times_query(session.get_bind().dialect.name),
+        {"keys": batch_keys_parameter(ranges), "limit": limit}
+    ).all()]
+
+def insert_prayer_times(session: Session, rows: Sequence[dict]) -> List[RowMapping]:
+    """Insert rows with a single executemany, returning the created records.
+
+    Rows whose (location_id, date) already exists are skipped by the
+    database, so callers can compare lengths to detect conflicts.
+    """
+    if not rows:
+        return []
+    now = _write_time(session)
+    values = [{**row, "created_at": now, "updated_at": now} for row in rows]
+    stmt, values = _insert_statement(session, values)
+    return _execute_returning(session, _skip_conflicts(stmt), values, rows, now)
+
+def upsert_prayer_times(session: Session, rows: Sequence[dict]) -> List[RowMapping]:
+    """INSERT ... ON CONFLICT (location_id, date) DO UPDATE for complete rows"""
+    if not rows:
+        return []
+    now = _write_time(session)
+    values = [{**row, "created_at": now, "updated_at": now} for row in rows]
+    stmt, values = _insert_statement(session, values)
+    return _execute_returning(session, _update_conflicts(stmt, (*PRAYER_FIELDS, "updated_at")), values, rows, now)
+
+def import_prayer_times(session: Session, rows: Sequence[dict], overwrite: bool = False) -> int:
+    """Insert rows (or upsert with `overwrite`) without RETURNING, for bulk loads.
+
+    Returns how many rows were written; existing (location_id, date) rows
+    are skipped unless `overwrite` is set.
+    """
+    if not rows:
+        return 0
+    now = _write_time(session)
+    values = [{**row, "created_at": now, "updated_at": now} for row in rows]
+    stmt, values = _insert_statement(session, values)
+    if overwrite:
+        stmt = _update_conflicts(stmt, (*PRAYER_FIELDS, "calculation_method", "updated_at"))
+    else:
+        stmt = _skip_conflicts(stmt)
+    return session.execute(stmt, values).rowcount
+
+def update_prayer_times(session: Session, range_updates: Dict[Tuple[str, ...], List[dict]], day_updates: Dict[Tuple[str, ...], List[dict]]):
+    """Partial updates as one executemany per set of fields.
+
+    `range_updates` parameters hold b_location_id, b_start and b_end,
+    `day_updates` parameters b_location_id and b_date, and both hold b_<field>
+    for each changed field.
+    """
+    now = _write_time(session)
+    for by_fields, where in (
+        (range_updates, prayer_times.c.date.between(
+            bindparam("b_start", type_=prayer_times.c.date.type), bindparam("b_end", type_=prayer_times.c.date.type)
+        )),
+        (day_updates, prayer_times.c.date == bindparam("b_date", type_=prayer_times.c.date.type)),
+    ):
+        for fields, parameters in by_fields.items():
+            stmt = (
+                update(prayer_times)
+                .where(prayer_times.c.location_id == bindparam("b_location_id", type_=Integer), where)
+                .values(
+                    **{field: bindparam(f"b_{field}", type_=prayer_times.c[field].type) for field in fields},
+                    updated_at=now
+                )
+            )
+            session.execute(stmt, parameters)
+
+def _batch_keys(dialect: str):
+    """Rows of the `:keys` JSON parameter: (position, location_id, start_date, end_date) expressions"""
+    if dialect == "sqlite":
+        keys = func.json_each(bindparam("keys", type_=String)).table_valued("key", "value").alias("batch_keys")
+        position = keys.c.key
+        location_id, start_date, end_date = (func.json_extract(keys.c.value, f"$[{index}]") for index in range(3))
+    elif dialect == "postgresql":
+        keys = (
+            func.jsonb_array_elements(cast(bindparam("keys", type_=String), postgresql.JSONB))
+            .table_valued("value", with_ordinality="position")
+            .render_derived(name="batch_keys")
+        )
+        position = keys.c.position - 1
+
+        def field(index: int, type_):
+            return cast(keys.c.value.op("->>")(literal_column(str(index))), type_)
+
+        location_id, start_date, end_date = field(0, Integer), field(1, Date), field(2, Date)
+    elif dialect == "mysql":
+        # MySQL 8 JSON_TABLE; its COLUMNS clause has no SQLAlchemy construct
+        keys = (
+            text(
+                "SELECT ordinal - 1 AS position, location_id, start_date, end_date FROM JSON_TABLE(:keys, '$[*]' COLUMNS ("
+                "ordinal FOR ORDINALITY, location_id INTEGER PATH '$[0]', "
+                "start_date DATE PATH '$[1]', end_date DATE PATH '$[2]')) AS json_keys"
+            )
+            .bindparams(bindparam("keys", type_=String))
+            .columns(column("position", Integer), column("location_id", Integer), column("start_date", Date), column("end_date", Date))
+            .subquery("batch_keys")
+        )
+        position, location_id, start_date, end_date = keys.c.position, keys.c.location_id, keys.c.start_date, keys.c.end_date
+    else:
+        raise NotImplementedError(f"Batch lookups are not supported on '{dialect}'")
+
+    in_key = and_(
+        PrayerTime.location_id == location_id,
+        PrayerTime.date >= start_date,
+        PrayerTime.date <= end_date
+    )
+    return keys, position, in_key
+
+@lru_cache(maxsize=None)
+def batch_prayer_times_query(dialect: str):
+    """PRAYER_TIME_COLUMNS, prefixed with the key's position, for every key in `:keys`.
+
+    `:keys` is one JSON array of [location_id, start_date, end_date], so the
+    statement is identical for any number of keys and compiled only once. A
+    VALUES list would need a bound parameter per value. Each key is joined
+    to prayer_times through the (location_id, date) index.
+    """
+    keys, position, in_key = _batch_keys(dialect)
+    return (
+        select(position.label("key"), *PRAYER_TIME_COLUMNS)
+        .join_from(keys, PrayerTime, in_key)
+        .order_by(position, PrayerTime.date)
+    )
+
+@lru_cache(maxsize=None)
+def existing_prayer_times_query(dialect: str):
+    """(location_id, date) of stored prayer times inside any key of `:keys`, at most `:limit`"""
+    keys, _, in_key = _batch_keys(dialect)
+    return (
+        select(PrayerTime.location_id, PrayerTime.date)
+        .join_from(keys, PrayerTime, in_key)
+        .order_by(PrayerTime.location_id, PrayerTime.date)
+        .limit(bindparam("limit", type_=Integer))
+    )
+
+@lru_cache(maxsize=None)
+def written_prayer_times_query(dialect: str):
+    """Stored rows inside any key of `:keys` last written at `:updated_at`"""
+    keys, _, in_key = _batch_keys(dialect)
+    return (
+        select(*prayer_times.c)
+        .join_from(keys, PrayerTime, in_key)
+        .where(prayer_times.c.updated_at == bindparam("updated_at", type_=prayer_times.c.updated_at.type))
+    )
+
+def batch_keys_parameter(ranges: Sequence[Tuple[int, date, date]]) -> str:
+    return orjson.dumps([[location_id, start.isoformat(), end.isoformat()] for location_id, start, end in ranges]).decode()
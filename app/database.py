@@ -1,15 +1,130 @@
+import threading
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import get_settings
+from .metrics import instrument_engine
+from .models.migration import SCHEMA_VERSION
+
+# Async driver used for each sync DATABASE_URL dialect
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
 
 settings = get_settings()
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+
+def get_async_database_url() -> str:
+    """ASYNC_DATABASE_URL if set, otherwise DATABASE_URL with its async driver"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, rest = settings.DATABASE_URL.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for '{dialect}'. Set ASYNC_DATABASE_URL.")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+def sqlite_pragmas(read_only: bool = False):
+    """Connect listener applying the SQLite profile from settings"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+class WriterBusy(Exception):
+    """No writer connection, or on SQLite no write lock, within WRITER_TIMEOUT; answered with 503"""
+
+# Statements that make a SQLite connection the writer
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+# SQLite allows one writer at a time. A transaction takes this lock at its
+# first write statement and holds it until commit or rollback, so writes
+# queue here instead of contending for the file lock, while sessions that
+# only read never wait for it.
+write_lock = threading.Lock()
+
+def _take_write_lock(connection, cursor, statement, parameters, context, executemany):
+    if connection.info.get("write_lock") or not statement.lstrip().upper().startswith(WRITE_STATEMENTS):
+        return
+    if not write_lock.acquire(timeout=settings.WRITER_TIMEOUT):
+        raise WriterBusy("Timed out waiting for the SQLite write lock")
+    connection.info["write_lock"] = True
+
+def _release_write_lock(info: dict):
+    if info.pop("write_lock", False):
+        write_lock.release()
+
+# Writer: admin mutations, auth writes and jobs
+if is_sqlite:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.SQLITE_WRITER_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=settings.WRITER_TIMEOUT
+    )
+    event.listen(engine, "connect", sqlite_pragmas())
+    event.listen(engine, "before_cursor_execute", _take_write_lock)
+    event.listen(engine, "commit", lambda connection: _release_write_lock(connection.info))
+    event.listen(engine, "rollback", lambda connection: _release_write_lock(connection.info))
+    # A connection returned to the pool mid-transaction never holds on to the lock
+    event.listen(engine, "reset", lambda dbapi_connection, record, state: _release_write_lock(record.info))
+else:
+    engine = create_engine(settings.DATABASE_URL, pool_timeout=settings.WRITER_TIMEOUT)
+
+# Reader: async GET routes. Under WAL, readers never wait for the writer.
+async_engine = create_async_engine(get_async_database_url())
+if is_sqlite:
+    event.listen(async_engine.sync_engine, "connect", sqlite_pragmas(read_only=True))
+
+if settings.METRICS_ENABLED or settings.QUERY_INSPECTION != "off":
+    instrument_engine(engine, "writer")
+    instrument_engine(async_engine.sync_engine, "reader")
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+def save(session: Session, instance):
+    """Add, commit and refresh; for async routes to run in the threadpool"""
+    session.add(instance)
+    session.commit()
+    session.refresh(instance)
+    return instance
+
 def init_db():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    """Create missing tables; run through `script.py migrate`, never at startup"""
+    SQLModel.metadata.create_all(engine)
+
+def check_schema():
+    """Refuse to start unless `script.py migrate` has brought the database to SCHEMA_VERSION.
+
+    One indexed read instead of create_all's per-table inspection on every
+    worker start.
+    """
+    try:
+        # Core, not a Session: the ORM's first-query setup would double startup time
+        with engine.connect() as connection:
+            version = connection.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+    except DBAPIError:
+        version = None  # no schema_migrations table yet
+    if (version or 0) < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version or 0}, expected {SCHEMA_VERSION}. "
+            "Run 'python script.py migrate' first."
+        )
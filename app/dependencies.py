@@ -1,13 +1,44 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
 from fastapi import Depends, HTTPException, Cookie
-from sqlmodel import Session, select
-from .database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .config import get_settings
+from .database import get_async_session
 from .models.user import User
 from .security import decode_token
 
-def get_current_user(
-    token: str = Cookie(None),
-    session: Session = Depends(get_session)
-) -> User:
+settings = get_settings()
+
+class Principal(NamedTuple):
+    """Read-only snapshot of an authenticated user, safe to share between requests"""
+    id: int
+    username: str
+    email: str
+    role: str
+    created_at: datetime
+    updated_at: datetime
+
+# username -> (expires, principal), for GET /users/me and tokens without
+# role or id claims. A hit skips the users lookup entirely; entries are
+# dropped when the user is changed or deleted in this process and expire
+# after PRINCIPAL_CACHE_TTL for changes made elsewhere.
+_principals: Dict[str, Tuple[float, Principal]] = {}
+_principals_lock = threading.Lock()
+
+def invalidate_principal(username: str):
+    with _principals_lock:
+        _principals.pop(username, None)
+
+class Claims(NamedTuple):
+    """What a verified token says about its user; id is missing from tokens issued before it was added"""
+    username: str
+    role: Optional[str]
+    id: Optional[int]
+
+def get_token_claims(token: str = Cookie(None)) -> Claims:
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
@@ -15,16 +46,51 @@ def get_current_user(
     username = payload.get("sub")
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    user = session.exec(select(User).where(User.username == username)).first()
+    return Claims(username, payload.get("role"), payload.get("uid"))
+
+async def _load_principal(username: str, session: AsyncSession) -> Principal:
+    with _principals_lock:
+        entry = _principals.get(username)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    user = (await session.exec(select(User).where(User.username == username))).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    
+
+    principal = Principal(user.id, user.username, user.email, user.role, user.created_at, user.updated_at)
+    with _principals_lock:
+        _principals[username] = (time.monotonic() + settings.PRINCIPAL_CACHE_TTL, principal)
+    return principal
+
+async def get_current_principal(
+    claims: Claims = Depends(get_token_claims),
+    session: AsyncSession = Depends(get_async_session)
+) -> Principal:
+    return await _load_principal(claims.username, session)
+
+async def get_current_user(
+    claims: Claims = Depends(get_token_claims),
+    session: AsyncSession = Depends(get_async_session)
+) -> User:
+    user = (await session.exec(select(User).where(User.username == claims.username))).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    # Detached, so routes can write it back through the writer session
+    session.expunge(user)
     return user
 
 def require_role(role: str):
-    def role_checker(user: User = Depends(get_current_user)):
-        if user.role != role:
+    """Check `role` against the token's claims; only tokens without role or id claims need the users lookup"""
+    async def role_checker(
+        claims: Claims = Depends(get_token_claims),
+        session: AsyncSession = Depends(get_async_session)
+    ) -> Claims:
+        if claims.role is None or claims.id is None:
+            principal = await _load_principal(claims.username, session)
+            claims = Claims(principal.username, principal.role, principal.id)
+        if claims.role != role:
             raise HTTPException(status_code=403, detail="Permission denied")
-        return user
-    return role_checker
\ No newline at end of file
+        return claims
+    return role_checker
@@ -0,0 +1,40 @@
+import threading
+from typing import Callable, Dict, Tuple
+
+# (clear count, location's invalidation count) when a read started
+Generation = Tuple[int, int]
+
+class Generations:
+    """Per-location invalidation counters for the read-side caches.
+
+    A read takes `get(location_id)` before it queries the database and
+    stores what it read only if the generation is still the same, so rows
+    read before an admin commit are never cached after that commit's
+    invalidation. Owners call `bump` and `current` under their own lock,
+    together with the eviction or the store they guard.
+    """
+    def __init__(self):
+        self._cleared = 0
+        self._counters: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, location_id: int) -> Generation:
+        with self._lock:
+            return self._cleared, self._counters.get(location_id, 0)
+
+    def snapshot(self) -> Callable[[int], Generation]:
+        """Every location's generation at once, for a read that covers all locations"""
+        with self._lock:
+            cleared, counters = self._cleared, dict(self._counters)
+        return lambda location_id: (cleared, counters.get(location_id, 0))
+
+    def current(self, location_id: int, generation: Generation) -> bool:
+        return self.get(location_id) == generation
+
+    def bump(self, location_id: int):
+        with self._lock:
+            self._counters[location_id] = self._counters.get(location_id, 0) + 1
+
+    def bump_all(self):
+        with self._lock:
+            self._cleared += 1
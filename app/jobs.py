@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import secrets
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+import orjson
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select, update
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from .cache import invalidate_prayer_times
+from .config import get_settings
+from .crud.prayer import apply_bulk_updates, bulk_create_rows, day_count, find_locations, insert_prayer_times, validate_bulk_items
+from .database import engine
+from .models.job import Job
+from .schemas.prayer import BulkPrayerTimeCreate, BulkPrayerTimeUpdate
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PENDING, RUNNING, COMPLETED, FAILED = "pending", "running", "completed", "failed"
+CREATE_PRAYER_TIMES = "prayer_times.create"
+UPDATE_PRAYER_TIMES = "prayer_times.update"
+
+jobs = Job.__table__
+# Everything but the payload, for status reads
+JOB_STATUS_COLUMNS = tuple(column for column in jobs.c if column.name != "payload")
+
+class ChunkResult(NamedTuple):
+    rows: int
+    errors: List[dict]
+    touched: List[Tuple[int, date, date]]  # (location_id, start, end) to evict from read caches
+
+def _known_cities(session: Session, items: Sequence, first: int):
+    """Locations for the chunk's cities, the items whose city exists, and errors for the rest"""
+    locations = find_locations(session, (item.city for item in items))
+    known, errors = [], []
+    for position, item in enumerate(items, first):
+        if item.city in locations:
+            known.append((position, item))
+        else:
+            errors.append({"item": position, "detail": f"City '{item.city}' not found"})
+    return locations, known, errors
+
+def _create_prayer_times(session: Session, items: Sequence[BulkPrayerTimeCreate], first: int) -> ChunkResult:
+    """Like POST /prayers/bulk, but dates that already exist are skipped and reported"""
+    locations, known, errors = _known_cities(session, items, first)
+    rows, touched = bulk_create_rows([item for _, item in known], locations)
+    created = insert_prayer_times(session, rows)
+    if len(created) != len(rows):
+        written = {(row["location_id"], row["date"]) for row in created}
+        for (position, _), (location_id, start, end) in zip(known, touched):
+            days = day_count(start, end)
+            skipped = sum((location_id, start + timedelta(days=offset)) not in written for offset in range(days))
+            if skipped:
+                errors.append({"item": position, "detail": f"{skipped} of {days} prayer times already exist and were skipped"})
+    return ChunkResult(len(created), errors, touched)
+
+def _update_prayer_times(session: Session, items: Sequence[BulkPrayerTimeUpdate], first: int) -> ChunkResult:
+    """Like PUT /prayers/bulk"""
+    locations, known, errors = _known_cities(session, items, first)
+    updated, touched = apply_bulk_updates(session, [item for _, item in known], locations)
+    return ChunkResult(len(updated), errors, touched)
+
+# kind -> (item schema, chunk handler run inside the chunk's transaction)
+HANDLERS: Dict[str, Tuple[Type[BaseModel], Callable[[Session, Sequence, int], ChunkResult]]] = {
+    CREATE_PRAYER_TIMES: (BulkPrayerTimeCreate, _create_prayer_times),
+    UPDATE_PRAYER_TIMES: (BulkPrayerTimeUpdate, _update_prayer_times),
+}
+
+def submit_job(session: Session, kind: str, items: Sequence[BaseModel], created_by: Optional[int] = None) -> dict:
+    """Validate and store a job, wake the runner and return the job's status"""
+    if not items:
+        raise HTTPException(status_code=400, detail="Nothing to do: the payload is empty")
+    if len(items) > settings.JOB_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.JOB_MAX_ITEMS} items per job")
+    # Reject malformed or overlapping ranges now rather than part-way through the job
+    validate_bulk_items(items)
+
+    job = Job(
+        kind=kind,
+        payload=orjson.dumps([item.model_dump(mode="json") for item in items]).decode(),
+        total_items=len(items),
+        created_by=created_by
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    job_runner.notify()
+    return job_status(job)
+
+def job_status(job) -> dict:
+    """JobResponse fields for a Job or a row of JOB_STATUS_COLUMNS"""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "total_items": job.total_items,
+        "items_done": job.items_done,
+        "progress": round(job.items_done / job.total_items, 4) if job.total_items else 1.0,
+        "rows_applied": job.rows_applied,
+        "error_count": job.error_count,
+        "errors": orjson.loads(job.errors),
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "updated_at": job.updated_at,
+    }
+
+class ClaimedJob:
+    """In-memory state of the job a runner holds the lease on"""
+    def __init__(self, id: int, kind: str, token: str, items: list, items_done: int, rows_applied: int, error_count: int, errors: list):
+        self.id = id
+        self.kind = kind
+        self.token = token
+        self.items = items
+        self.items_done = items_done
+        self.rows_applied = rows_applied
+        self.error_count = error_count
+        self.errors = errors
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _claimable(now: datetime):
+    return (
+        jobs.c.status.in_((PENDING, RUNNING)),
+        or_(jobs.c.lease_expires_at.is_(None), jobs.c.lease_expires_at < now)
+    )
+
+def claim_job() -> Optional[ClaimedJob]:
+    """Take the lease on the oldest pending job, or a running one whose runner went away"""
+    now = _utcnow()
+    with Session(engine) as session:
+        job_id = session.execute(
+            select(jobs.c.id).where(*_claimable(now)).order_by(jobs.c.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+
+        # Compare-and-set: of several workers polling, only one gets the job
+        token = secrets.token_hex(16)
+        claimed = session.execute(
+            update(jobs).where(jobs.c.id == job_id, *_claimable(now)).values(
+                status=RUNNING,
+                lease_token=token,
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                started_at=func.coalesce(jobs.c.started_at, now),
+                updated_at=now
+            )
+        ).rowcount
+        if not claimed:
+            session.rollback()
+            return None
+        row = session.execute(
+            select(jobs.c.kind, jobs.c.payload, jobs.c.items_done, jobs.c.rows_applied, jobs.c.error_count, jobs.c.errors)
+            .where(jobs.c.id == job_id)
+        ).one()
+        session.commit()
+    return ClaimedJob(job_id, row.kind, token, orjson.loads(row.payload), row.items_done, row.rows_applied, row.error_count, orjson.loads(row.errors))
+
+def apply_chunk(job: ClaimedJob, items: Sequence[BaseModel]) -> bool:
+    """Apply `items` and record the progress in one transaction; False if the lease was lost"""
+    _, handler = HANDLERS[job.kind]
+    with Session(engine) as session:
+        result = handler(session, items, job.items_done)
+        errors = (job.errors + result.errors)[:settings.JOB_MAX_ERRORS]
+        now = _utcnow()
+        renewed = session.execute(
+            update(jobs).where(jobs.c.id == job.id, jobs.c.lease_token == job.token).values(
+                items_done=job.items_done + len(items),
+                rows_applied=job.rows_applied + result.rows,
+                error_count=job.error_count + len(result.errors),
+                errors=orjson.dumps(errors).decode(),
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                updated_at=now
+            )
+        ).rowcount
+        if not renewed:
+            # Another runner took the job over; it applies this chunk itself
+            session.rollback()
+            return False
+        session.commit()
+
+    job.items_done += len(items)
+    job.rows_applied += result.rows
+    job.error_count += len(result.errors)
+    job.errors = errors
+    for location_id, start, end in result.touched:
+        invalidate_prayer_times(location_id, (start, end))
+    return True
+
+def finish_job(job: ClaimedJob, status: Optional[str], detail: Optional[str] = None):
+    """Record the outcome and drop the lease; no status keeps the job running for the next claim"""
+    values = {"lease_token": None, "lease_expires_at": None, "updated_at": _utcnow()}
+    if status is not None:
+        values.update(status=status, finished_at=values["updated_at"])
+    if detail is not None:
+        job.errors = (job.errors + [{"item": job.items_done, "detail": detail}])[:settings.JOB_MAX_ERRORS]
+        values.update(errors=orjson.dumps(job.errors).decode(), error_count=job.error_count + 1)
+    with Session(engine) as session:
+        session.execute(update(jobs).where(jobs.c.id == job.id, jobs.c.lease_token == job.token).values(**values))
+        session.commit()
+
+class JobRunner:
+    """Applies stored jobs in the background of a worker, one chunk per transaction.
+
+    Chunks run on the threadpool through the writer engine, and the runner
+    pauses JOB_CHUNK_PAUSE between them, so other writes (and, on SQLite,
+    the write lock) get a turn and readers see each chunk as it commits.
+    A job's progress is committed with its chunk, so after a crash or
+    restart another claim resumes at the first unapplied item. Jobs are
+    claimed under a lease, which lets every worker run a runner.
+    """
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish the current chunk, then hand the job back for the next start"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    def notify(self):
+        """Check for jobs now instead of at the next poll; safe from any thread"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                job = await run_in_threadpool(claim_job)
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._apply(job)
+            except Exception:
+                # Could not even record the failure; the lease expires and the job is retried
+                logger.exception("Job %s stopped", job.id)
+
+    async def _apply(self, job: ClaimedJob):
+        model, _ = HANDLERS[job.kind]
+        try:
+            while job.items_done < len(job.items):
+                if self._stopping:
+                    await run_in_threadpool(finish_job, job, None)
+                    return
+                chunk = job.items[job.items_done:job.items_done + settings.JOB_CHUNK_ITEMS]
+                if not await run_in_threadpool(apply_chunk, job, [model.model_validate(item) for item in chunk]):
+                    logger.warning("Lost the lease on job %s; another runner continues it", job.id)
+                    return
+                await asyncio.sleep(settings.JOB_CHUNK_PAUSE)
+            await run_in_threadpool(finish_job, job, COMPLETED)
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            await run_in_threadpool(finish_job, job, FAILED, f"Unexpected error: {str(e)}")
+
+job_runner = JobRunner()
@@ -1,13 +1,37 @@
-from fastapi import FastAPI
+import time
+import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from .database import init_db
-from .api.v1.endpoints import auth, user, location, prayer
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .config import get_settings
+from .database import WriterBusy, async_engine, check_schema
+from .metrics import CONTENT_TYPE_LATEST, STARTUP, MetricsMiddleware, render as render_metrics
+from .query_budget import QueryBudgetMiddleware
+from .admission import AdmissionMiddleware
+from .compression import CompressionMiddleware
+from .timetable import timetable_store
+from .security import password_hasher
+from .jobs import job_runner
+from .api.v1.endpoints import auth, user, location, prayer, job
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    started = time.perf_counter()
+    # Schema changes run only through `script.py migrate`
+    check_schema()
+    if get_settings().TIMETABLE_STORE:
+        async with AsyncSession(async_engine) as session:
+            await timetable_store.load_all(session)
+    if get_settings().JOBS_ENABLED:
+        job_runner.start()
+    STARTUP.labels("lifespan").set(time.perf_counter() - started)
     yield
+    await job_runner.stop()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Azan API",
@@ -16,6 +40,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# gzip/brotli; innermost, so compression time counts against the route
+if get_settings().RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=get_settings().COMPRESSION_MIN_SIZE)
+
+# Per route class concurrency caps and rate limits; inside CORS so 503/429
+# answers still carry CORS headers
+if get_settings().ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -23,13 +56,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "ETag", "Last-Modified", "Retry-After"],
 )
 
+# Outermost, so latency includes CORS handling
+if get_settings().METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Development/CI: count SQL per request, flag N+1 patterns, enforce budgets
+if get_settings().QUERY_INSPECTION != "off":
+    app.add_middleware(
+        QueryBudgetMiddleware,
+        mode=get_settings().QUERY_INSPECTION,
+        repeat_threshold=get_settings().QUERY_REPEAT_THRESHOLD,
+        default_budget=get_settings().QUERY_BUDGET_DEFAULT
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(user.router, prefix="/users", tags=["Users"])
 app.include_router(location.router, prefix="/locations", tags=["Locations"])
 app.include_router(prayer.router, prefix="/prayers", tags=["Prayers"])
+app.include_router(job.router, prefix="/jobs", tags=["Jobs"])
+
+# A pool or the SQLite write lock stayed busy past WRITER_TIMEOUT: shed the
+# request like admission control does rather than queue it further
+@app.exception_handler(WriterBusy)
+@app.exception_handler(PoolTimeout)
+async def database_busy(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, retry shortly"},
+        headers={"Retry-After": str(get_settings().ADMISSION_RETRY_AFTER)}
+    )
 
 @app.get("/")
 def root():
@@ -39,6 +98,15 @@ def root():
         "documentation": "/docs"
     }
 
+# 📈 Prometheus metrics for this worker process
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not get_settings().METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+STARTUP.labels("import").set(time.perf_counter() - import_started)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
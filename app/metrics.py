@@ -0,0 +1,173 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from anyio import to_thread
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+
+REQUEST_DURATION = Histogram(
+    "azan_http_request_duration_seconds", "Time to send a complete response, by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("azan_http_requests_in_flight", "Requests being handled", ["method"])
+REQUEST_QUERIES = Histogram(
+    "azan_http_request_db_queries", "SQL statements executed per request, by route template",
+    ["method", "route"], buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "azan_http_request_db_seconds", "Time spent executing SQL per request, by route template",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+DB_QUERIES = Counter("azan_db_queries_total", "SQL statements executed", ["engine"])
+DB_TIME = Counter("azan_db_query_seconds_total", "Time spent executing SQL", ["engine"])
+POOL_CHECKOUT = Histogram(
+    "azan_db_pool_checkout_seconds", "Time to get a pooled connection, including waits for a free one",
+    ["engine"], buckets=LATENCY_BUCKETS
+)
+POOL_CHECKED_OUT = Gauge("azan_db_pool_checked_out", "Connections currently checked out", ["engine"])
+THREADPOOL_BUSY = Gauge("azan_threadpool_busy_threads", "Worker threads running sync endpoints and dependencies")
+THREADPOOL_SIZE = Gauge("azan_threadpool_threads", "Worker thread limit")
+THREADPOOL_QUEUE = Gauge("azan_threadpool_queue_depth", "Calls waiting for a free worker thread")
+ADMISSION_IN_FLIGHT = Gauge("azan_admission_in_flight", "Requests admitted and running, by route class", ["route_class"])
+ADMISSION_QUEUED = Gauge("azan_admission_queued", "Requests waiting for a slot, by route class", ["route_class"])
+ADMISSION_REJECTED = Counter(
+    "azan_admission_rejected_total", "Requests shed (503) or rate limited (429)", ["route_class", "reason"]
+)
+STARTUP = Gauge("azan_startup_seconds", "Worker cold start: app import, lifespan startup and first response", ["phase"])
+
+class RequestQueries:
+    """SQL executed while handling one request.
+
+    Shared with the threadpool and the async driver's greenlets, which copy
+    the request's context. `statements` counts executions per SQL string and
+    is only kept when something inspects it (see app/query_budget.py).
+    """
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Optional[Dict[str, int]] = None
+
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+@contextmanager
+def track_queries(statements: bool = False) -> Iterator[RequestQueries]:
+    """Collect the SQL run in this context, joining an enclosing collector if any"""
+    queries = _request_queries.get()
+    if queries is not None:
+        if statements and queries.statements is None:
+            queries.statements = {}
+        yield queries
+        return
+
+    queries = RequestQueries()
+    if statements:
+        queries.statements = {}
+    token = _request_queries.set(queries)
+    try:
+        yield queries
+    finally:
+        _request_queries.reset(token)
+
+def instrument_engine(engine: Engine, name: str):
+    """Count statements and DB time, and time pool checkouts, for a (sync) engine"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Batches of one executemany/insertmanyvalues call are not repeated queries
+        record_query(name, time.perf_counter() - conn.info["query_started"].pop(), None if executemany else statement)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            record_query(name, time.perf_counter() - started.pop(), context.statement)
+
+    # The pool has no "before checkout" event, so time the call that hands out
+    # a connection (waiting on a full pool or opening a new connection)
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            POOL_CHECKOUT.labels(name).observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+    if hasattr(pool, "checkedout"):
+        POOL_CHECKED_OUT.labels(name).set_function(pool.checkedout)
+
+def record_query(engine_name: str, seconds: float, statement: Optional[str] = None):
+    DB_QUERIES.labels(engine_name).inc()
+    DB_TIME.labels(engine_name).inc(seconds)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries.count += 1
+        queries.seconds += seconds
+        if queries.statements is not None and statement:
+            queries.statements[statement] = queries.statements.get(statement, 0) + 1
+
+def render() -> bytes:
+    """Prometheus text exposition; call from the event loop to sample the threadpool"""
+    limiter = to_thread.current_default_thread_limiter().statistics()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+    THREADPOOL_QUEUE.set(limiter.tasks_waiting)
+    return generate_latest()
+
+class MetricsMiddleware:
+    """Records latency, status and DB usage per route template.
+
+    Routes are labelled by their template (`/prayers/{id}`), never the raw
+    path; requests that match no route share the `unmatched` label.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.first_request = True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        with track_queries() as queries:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - started
+                in_flight.dec()
+                template = route_template(scope)
+                REQUEST_DURATION.labels(method, template, str(status)).observe(elapsed)
+                REQUEST_QUERIES.labels(method, template).observe(queries.count)
+                REQUEST_DB_TIME.labels(method, template).observe(queries.seconds)
+                if self.first_request:
+                    self.first_request = False
+                    STARTUP.labels("first_request").set(elapsed)
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled `scope`, once routing has run"""
+    return getattr(scope.get("route"), "path", "unmatched")
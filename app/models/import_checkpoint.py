@@ -0,0 +1,11 @@
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field
+
+class ImportCheckpoint(SQLModel, table=True):
+    __tablename__ = "import_checkpoints"
+
+    source: str = Field(primary_key=True)  # absolute path of the imported file
+    fingerprint: str  # size and mtime; a changed file starts over
+    rows_committed: int = 0
+    completed: bool = False
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
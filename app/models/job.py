@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class Job(SQLModel, table=True):
+    __tablename__ = "jobs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str  # see app/jobs.py HANDLERS
+    status: str = Field(default="pending", index=True)  # pending, running, completed, failed
+    payload: str  # JSON array of submitted items
+    total_items: int
+    items_done: int = 0  # items applied; a resumed job continues from here
+    rows_applied: int = 0
+    error_count: int = 0
+    errors: str = "[]"  # JSON array of {"item", "detail"}, the first JOB_MAX_ERRORS only
+    created_by: Optional[int] = Field(default=None, foreign_key="users.id")
+    lease_token: Optional[str] = None  # runner currently applying the job
+    lease_expires_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
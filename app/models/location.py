@@ -1,7 +1,15 @@
+import unicodedata
 from datetime import datetime, timezone
 from typing import Optional
+from sqlalchemy import event
 from sqlmodel import SQLModel, Field
 
+def normalize_name(name: str) -> str:
+    """Lookup key for a place name: accents stripped, casefolded, single-spaced"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
 class Location(SQLModel, table=True):
     __tablename__ = "locations"
     
@@ -11,5 +19,15 @@ class Location(SQLModel, table=True):
     latitude: float
     longitude: float
     timezone: str
+    calculation_method: str = Field(default="MWL")
+    # Maintained from city/country on every ORM insert and update
+    city_key: str = Field(default="", index=True)
+    country_key: str = Field(default="", index=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+@event.listens_for(Location, "before_insert")
+@event.listens_for(Location, "before_update")
+def _set_lookup_keys(mapper, connection, location: Location):
+    location.city_key = normalize_name(location.city)
+    location.country_key = normalize_name(location.country)
@@ -0,0 +1,13 @@
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field
+
+# Latest entry in app/scripts/migrations.py MIGRATIONS; workers refuse to
+# start against a database that has not been migrated this far
+SCHEMA_VERSION = 5
+
+class SchemaMigration(SQLModel, table=True):
+    __tablename__ = "schema_migrations"
+
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -1,9 +1,12 @@
 from datetime import datetime, date, time, timezone
 from typing import Optional
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Index
 
 class PrayerTime(SQLModel, table=True):
     __tablename__ = "prayer_times"
+    __table_args__ = (
+        Index("ix_prayer_times_location_id_date", "location_id", "date", unique=True),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     location_id: int = Field(foreign_key="locations.id")
@@ -15,4 +18,4 @@ class PrayerTime(SQLModel, table=True):
     isha: time
     calculation_method: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
\ No newline at end of file
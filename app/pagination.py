@@ -0,0 +1,61 @@
+from typing import Literal, Optional, Sequence, Type
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .database import async_engine
+from .serialization import encode_row
+
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+
+class PageParams:
+    """Keyset pagination and output format for list endpoints.
+
+    Without `limit` the whole result is returned, as before. Pass the
+    `X-Next-After-Id` response header back as `after_id` to get the next page.
+    """
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after_id: Optional[int] = Query(None, ge=0),
+        format: Literal["json", "ndjson"] = "json"
+    ):
+        self.limit = limit
+        self.after_id = after_id
+        self.format = format
+
+def paginate(query, id_column, page: PageParams):
+    """Apply `id > after_id ORDER BY id LIMIT limit` to a select"""
+    if page.after_id is not None:
+        query = query.where(id_column > page.after_id)
+    query = query.order_by(id_column)
+    if page.limit is not None:
+        query = query.limit(page.limit)
+    return query
+
+def set_next_cursor(response: Response, rows: Sequence, page: PageParams):
+    if page.limit is not None and len(rows) == page.limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1].id)
+
+def stream_ndjson(query, schema: Optional[Type[BaseModel]] = None) -> StreamingResponse:
+    """Stream query results as newline-delimited JSON in fixed-size chunks.
+
+    Entity queries are validated through `schema`; column queries built with
+    `response_columns` are encoded as they come. Rows are fetched with a
+    server-side cursor in its own session, since the request session is
+    closed before a streaming body is sent.
+    """
+    async def lines():
+        async with AsyncSession(async_engine) as session:
+            streamed = query.execution_options(yield_per=STREAM_CHUNK_SIZE)
+            if schema is None:
+                result = await session.stream(streamed)
+                async for rows in result.partitions():
+                    yield b"".join(encode_row(row) + b"\n" for row in rows)
+            else:
+                result = await session.stream_scalars(streamed)
+                async for rows in result.partitions():
+                    yield "".join(schema.model_validate(row).model_dump_json() + "\n" for row in rows)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,125 @@
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import RequestQueries, route_template, track_queries
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "warn", "strict")
+HEADER_STATEMENT_LENGTH = 200
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+# IN lists and multi-row VALUES render one placeholder per value
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_MULTI_ROW = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+def query_budget(limit: int) -> Callable:
+    """Declare the most SQL statements a route may run per request.
+
+    Place under the router decorator:
+
+        @router.get("/single")
+        @query_budget(2)
+        async def get_single_prayer_time(...): ...
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.query_budget = limit
+        return endpoint
+    return decorate
+
+def statement_shape(statement: str) -> str:
+    """SQL with whitespace and placeholder lists collapsed, so an IN of 1 and of 30 ids match"""
+    shape = " ".join(statement.split())
+    shape = _PLACEHOLDER_LIST.sub("(...)", shape)
+    return _MULTI_ROW.sub("(...)", shape)
+
+def repeated_statements(queries: RequestQueries, threshold: int) -> List[Tuple[str, int]]:
+    """Statement shapes executed at least `threshold` times, most frequent first"""
+    shapes: Dict[str, int] = {}
+    for statement, count in (queries.statements or {}).items():
+        shape = statement_shape(statement)
+        shapes[shape] = shapes.get(shape, 0) + count
+    return sorted(
+        ((shape, count) for shape, count in shapes.items() if count >= threshold),
+        key=lambda item: -item[1]
+    )
+
+def _header_value(value: str) -> bytes:
+    return value[:HEADER_STATEMENT_LENGTH].encode("latin-1", "replace")
+
+class QueryBudgetMiddleware:
+    """Development/test check of the SQL each request runs.
+
+    Adds `X-Query-Count`, `X-Query-Budget` and one `X-Query-Repeated` header
+    per statement shape run QUERY_REPEAT_THRESHOLD or more times (a likely
+    N+1), and logs a warning for either problem. In "strict" mode a request
+    over its route's `query_budget` (or QUERY_BUDGET_DEFAULT) is answered
+    with 500 instead, so CI fails on the regression. Counts are taken when
+    the response starts, so SQL run while streaming a body is not checked.
+    """
+    def __init__(self, app: ASGIApp, mode: str = "warn", repeat_threshold: int = 5, default_budget: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown query inspection mode '{mode}', expected one of {', '.join(MODES)}")
+        self.app = app
+        self.mode = mode
+        self.repeat_threshold = repeat_threshold
+        self.default_budget = default_budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        rejected = False
+
+        async def send_wrapper(message: Message):
+            nonlocal rejected
+            if rejected:
+                return  # the handler's own response is dropped
+            if message["type"] == "http.response.start":
+                message, body = self._inspect(scope, queries, message)
+                if body is not None:
+                    rejected = True
+                    await send(message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+            await send(message)
+
+        with track_queries(statements=True) as queries:
+            await self.app(scope, receive, send_wrapper)
+
+    def _inspect(self, scope: Scope, queries: RequestQueries, message: Message) -> Tuple[Message, Optional[bytes]]:
+        """Response start with diagnostic headers, plus a replacement body if rejected"""
+        route = scope.get("route")
+        budget = getattr(getattr(route, "endpoint", None), "query_budget", self.default_budget)
+        repeated = repeated_statements(queries, self.repeat_threshold)
+        where = f"{scope['method']} {route_template(scope)}"
+
+        headers = [(b"x-query-count", str(queries.count).encode())]
+        if budget is not None:
+            headers.append((b"x-query-budget", str(budget).encode()))
+        for shape, count in repeated:
+            logger.warning("Statement ran %d times in %s (likely N+1): %s", count, where, shape)
+            headers.append((b"x-query-repeated", _header_value(f"{count}x {shape}")))
+
+        over_budget = budget is not None and queries.count > budget
+        if over_budget:
+            logger.warning("%s ran %d SQL statements, over its budget of %d", where, queries.count, budget)
+        if not (over_budget and self.mode == "strict"):
+            return {**message, "headers": [*message.get("headers", []), *headers]}, None
+
+        body = orjson.dumps({
+            "detail": f"Query budget exceeded: {queries.count} statements, budget {budget}",
+            "repeated": [{"count": count, "statement": shape} for shape, count in repeated],
+        })
+        return {
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers
+            ],
+        }, body
@@ -0,0 +1,100 @@
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .config import get_settings
+from .crud.prayer import PRAYER_FIELDS
+from .generations import Generation, Generations
+
+settings = get_settings()
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    """ZoneInfo per timezone name; ValueError for unknown names rather than guessing UTC"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'")
+
+class PrayerInstant(NamedTuple):
+    prayer: str
+    date: date
+    at: datetime  # UTC
+
+class Schedule(NamedTuple):
+    """Every prayer of a location between two local dates, in time order"""
+    start: date
+    end: date
+    instants: List[float]  # POSIX timestamps, sorted
+    prayers: List[PrayerInstant]
+
+def build_schedule(rows: Sequence, zone: ZoneInfo, start: date, end: date) -> Schedule:
+    """Convert local prayer times to UTC instants in `zone`, honouring DST per day"""
+    prayers = []
+    for row in rows:
+        for field in PRAYER_FIELDS:
+            local = datetime.combine(row.date, getattr(row, field), tzinfo=zone)
+            prayers.append(PrayerInstant(field, row.date, local.astimezone(timezone.utc)))
+    prayers.sort(key=lambda prayer: prayer.at)
+    return Schedule(start, end, [prayer.at.timestamp() for prayer in prayers], prayers)
+
+def locate(schedule: Schedule, at: datetime) -> Tuple[Optional[PrayerInstant], Optional[PrayerInstant]]:
+    """(current, next) prayer around `at`; current is the latest one not after it"""
+    index = bisect_right(schedule.instants, at.timestamp())
+    current = schedule.prayers[index - 1] if index > 0 else None
+    upcoming = schedule.prayers[index] if index < len(schedule.prayers) else None
+    return current, upcoming
+
+class ScheduleCache:
+    """location_id → (expires, timezone name, Schedule) for /prayers/next.
+
+    A schedule covers SCHEDULE_DAYS of local dates starting the day before
+    the requested instant, so isha → fajr across midnight needs no second
+    lookup. Writes drop the location through `invalidate_prayer_times`, and
+    a schedule read before such a write is not stored (see `generation`).
+    """
+    def __init__(self, days: int, ttl: float):
+        self.days = days
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, str, Schedule]] = {}
+        self._lock = threading.Lock()
+        self._generations = Generations()
+
+    def get(self, location_id: int, at: datetime) -> Optional[Tuple[str, Schedule]]:
+        """(timezone name, schedule) if cached with a window around the local date of `at`"""
+        with self._lock:
+            entry = self._entries.get(location_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        _, timezone_name, schedule = entry
+        today = at.astimezone(get_zone(timezone_name)).date()
+        if not schedule.start < today < schedule.end:
+            return None
+        return timezone_name, schedule
+
+    def window(self, timezone_name: str, at: datetime) -> Tuple[date, date]:
+        today = at.astimezone(get_zone(timezone_name)).date()
+        return today - timedelta(days=1), today + timedelta(days=self.days - 1)
+
+    def generation(self, location_id: int) -> Generation:
+        return self._generations.get(location_id)
+
+    def set(self, location_id: int, timezone_name: str, schedule: Schedule, generation: Generation):
+        with self._lock:
+            if self._generations.current(location_id, generation):
+                self._entries[location_id] = (time.monotonic() + self.ttl, timezone_name, schedule)
+
+    def invalidate(self, location_id: int):
+        with self._lock:
+            self._generations.bump(location_id)
+            self._entries.pop(location_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generations.bump_all()
+            self._entries.clear()
+
+schedule_cache = ScheduleCache(settings.SCHEDULE_DAYS, settings.SCHEDULE_CACHE_TTL)
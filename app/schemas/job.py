@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class JobError(BaseModel):
+    item: int  # position in the submitted array
+    detail: str
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str  # pending, running, completed or failed
+    total_items: int
+    items_done: int
+    progress: float  # items_done / total_items
+    rows_applied: int
+    error_count: int
+    errors: List[JobError]  # the first JOB_MAX_ERRORS
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime
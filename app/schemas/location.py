@@ -1,6 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .prayer import PrayerTimeResponse
+
+def known_timezone(name: Optional[str]) -> Optional[str]:
+    """IANA timezone names only: prayer instants and local dates are computed in it"""
+    if name is not None:
+        try:
+            ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone '{name}'")
+    return name
 
 class LocationBase(BaseModel):
     city: str
@@ -8,9 +19,10 @@ class LocationBase(BaseModel):
     latitude: float
     longitude: float
     timezone: str
+    calculation_method: str = "MWL"
 
 class LocationCreate(LocationBase):
-    pass
+    _timezone = field_validator("timezone")(known_timezone)
 
 class LocationUpdate(BaseModel):
     city: Optional[str] = None
@@ -18,6 +30,9 @@ class LocationUpdate(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     timezone: Optional[str] = None
+    calculation_method: Optional[str] = None
+
+    _timezone = field_validator("timezone")(known_timezone)
 
 class LocationResponse(LocationBase):
     id: int
@@ -25,4 +40,8 @@ class LocationResponse(LocationBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NearestLocationResponse(LocationResponse):
+    distance_km: float
+    prayer_time: Optional[PrayerTimeResponse] = None  # today's, with include_prayer_times
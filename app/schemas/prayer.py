@@ -1,15 +1,20 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional, Union
+from datetime import date, datetime, time
+
+Date = date  # field named `date` shadows the type inside class bodies
+
+# One time for every day of a bulk range, or one time per day in order
+TimeOrTimes = Union[time, List[time]]
 
 class PrayerTimeBase(BaseModel):
     location_id: int
-    date: datetime
-    fajr: datetime
-    dhuhr: datetime
-    asr: datetime
-    maghrib: datetime
-    isha: datetime
+    date: date
+    fajr: time
+    dhuhr: time
+    asr: time
+    maghrib: time
+    isha: time
     calculation_method: str
 
 class PrayerTimeCreate(PrayerTimeBase):
@@ -17,35 +22,47 @@ class PrayerTimeCreate(PrayerTimeBase):
 
 class BulkPrayerTimeCreate(BaseModel):
     city: str
-    month: int
-    date_range: str  # Example: "1-10"
-    fajr: str
-    dhuhr: str
-    asr: str
-    maghrib: str
-    isha: str
+    start_date: Optional[date] = None  # inclusive range, any span, or
+    end_date: Optional[date] = None
+    month: Optional[int] = None  # days of one month
+    date_range: Optional[str] = None  # Example: "1-10"
+    year: Optional[int] = None  # with month; defaults to the current year
+    fajr: TimeOrTimes
+    dhuhr: TimeOrTimes
+    asr: TimeOrTimes
+    maghrib: TimeOrTimes
+    isha: TimeOrTimes
     calculation_method: str
 
 class PrayerTimeUpdate(BaseModel):
     id: int
     location_id: Optional[int] = None
-    date: Optional[datetime] = None
-    fajr: Optional[datetime] = None
-    dhuhr: Optional[datetime] = None
-    asr: Optional[datetime] = None
-    maghrib: Optional[datetime] = None
-    isha: Optional[datetime] = None
+    date: Optional[Date] = None
+    fajr: Optional[time] = None
+    dhuhr: Optional[time] = None
+    asr: Optional[time] = None
+    maghrib: Optional[time] = None
+    isha: Optional[time] = None
     calculation_method: Optional[str] = None
 
 class BulkPrayerTimeUpdate(BaseModel):
     city: str
-    month: int
-    date_range: str  # Example: "1-10"
-    fajr: Optional[str] = None
-    dhuhr: Optional[str] = None
-    asr: Optional[str] = None
-    maghrib: Optional[str] = None
-    isha: Optional[str] = None
+    start_date: Optional[date] = None  # inclusive range, any span, or
+    end_date: Optional[date] = None
+    month: Optional[int] = None  # days of one month
+    date_range: Optional[str] = None  # Example: "1-10"
+    year: Optional[int] = None  # with month; defaults to the current year
+    fajr: Optional[TimeOrTimes] = None
+    dhuhr: Optional[TimeOrTimes] = None
+    asr: Optional[TimeOrTimes] = None
+    maghrib: Optional[TimeOrTimes] = None
+    isha: Optional[TimeOrTimes] = None
+
+class PrayerTimeGenerate(BaseModel):
+    location_ids: Optional[List[int]] = None  # None → every location
+    start_date: date
+    end_date: date
+    overwrite: bool = False
 
 class PrayerTimeResponse(PrayerTimeBase):
     id: int
@@ -54,3 +71,28 @@ class PrayerTimeResponse(PrayerTimeBase):
 
     class Config:
         from_attributes = True
+
+class PrayerTimeBatchKey(BaseModel):
+    location_id: int
+    date: Optional[Date] = None  # one day, or
+    start_date: Optional[Date] = None  # an inclusive range
+    end_date: Optional[Date] = None
+
+class PrayerTimeBatchResult(BaseModel):
+    location_id: int
+    start_date: date
+    end_date: date
+    prayer_times: List[PrayerTimeResponse]  # empty when nothing is stored
+
+class PrayerInstantResponse(BaseModel):
+    prayer: str  # fajr, dhuhr, asr, maghrib or isha
+    date: date   # local date the prayer belongs to
+    at: datetime  # UTC
+
+class NextPrayerResponse(BaseModel):
+    location_id: int
+    timezone: str
+    now: datetime
+    current: Optional[PrayerInstantResponse] = None
+    next: PrayerInstantResponse
+    seconds_until_next: int
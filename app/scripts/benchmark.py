@@ -0,0 +1,97 @@
+import time
+import tracemalloc
+from datetime import date, datetime, time as clock, timedelta, timezone
+from typing import Callable, Dict, List
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.models.location import Location
+from app.models.prayer import PrayerTime
+from app.schemas.prayer import PrayerTimeResponse
+from app.serialization import encode_rows, response_columns
+from app.timetable import TimetableStore
+
+def _traced(fn: Callable):
+    """Run `fn`, returning its result and the bytes it left allocated"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def _seed(session: Session, rows: int):
+    session.add(Location(id=1, city="Colombo", country="Sri Lanka", latitude=6.93, longitude=79.85, timezone="Asia/Colombo"))
+    now = datetime.now(timezone.utc)
+    times = {"fajr": clock(4, 50), "dhuhr": clock(12, 10), "asr": clock(15, 30), "maghrib": clock(18, 15), "isha": clock(19, 30)}
+    session.exec(insert(PrayerTime), params=[
+        {"location_id": 1, "date": date(2000, 1, 1) + timedelta(days=day), **times,
+         "calculation_method": "MWL", "created_at": now, "updated_at": now}
+        for day in range(rows)
+    ])
+    session.commit()
+
+def _best_of(repeat: int, fn: Callable[[], bytes]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def benchmark_serialization(sizes: List[int], repeat: int = 3) -> List[Dict]:
+    """Time select + encode for the response_model path and the column/orjson path.
+
+    Runs against a throwaway in-memory SQLite database so results only
+    reflect query materialization and encoding.
+    """
+    adapter = TypeAdapter(List[PrayerTimeResponse])
+    columns = response_columns(PrayerTime, PrayerTimeResponse)
+    results = []
+    for size in sizes:
+        bind = create_engine("sqlite://")
+        SQLModel.metadata.create_all(bind)
+        with Session(bind) as session:
+            _seed(session, size)
+
+            def models() -> bytes:
+                rows = session.exec(select(PrayerTime)).all()
+                body = adapter.dump_json(adapter.validate_python(rows))
+                session.expunge_all()
+                return body
+
+            def tuples() -> bytes:
+                return encode_rows(session.exec(select(*columns)).all())
+
+            assert adapter.validate_json(models()) == adapter.validate_json(tuples())
+            model_time = _best_of(repeat, models)
+            tuple_time = _best_of(repeat, tuples)
+        bind.dispose()
+        results.append({
+            "rows": size,
+            "response_model_ms": round(model_time * 1000, 1),
+            "columns_orjson_ms": round(tuple_time * 1000, 1),
+            "speedup": round(model_time / tuple_time, 1),
+        })
+    return results
+
+def benchmark_timetable_memory(years: int = 3) -> Dict:
+    """Memory per location-year: PrayerTime entities in a Session vs the timetable store"""
+    bind = create_engine("sqlite://")
+    SQLModel.metadata.create_all(bind)
+    with Session(bind) as session:
+        _seed(session, years * 365)
+        session.expunge_all()
+
+        # Entities stay referenced by the session's identity map, as in a request
+        entities, orm_bytes = _traced(lambda: session.exec(select(PrayerTime)).all())
+        rows = session.exec(select(*response_columns(PrayerTime, PrayerTimeResponse))).all()
+        store = TimetableStore(ttl=3600)
+        blocks, store_bytes = _traced(lambda: store._build(rows))
+    bind.dispose()
+    return {
+        "location_years": len(blocks),
+        "orm_bytes_per_location_year": orm_bytes // len(blocks),
+        "store_bytes_per_location_year": store_bytes // len(blocks),
+        "store_array_bytes_per_location_year": sum(block.nbytes for block in blocks.values()) // len(blocks),
+    }
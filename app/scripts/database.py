@@ -2,11 +2,14 @@ from sqlmodel import SQLModel, Session
 from app.database import engine
 from app.models.user import User
 from app.models.location import Location
+from app.models.prayer import PrayerTime
+from app.scripts.migrations import stamp
 
 def reset_database():
     """Drop all tables and recreate them"""
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
+    stamp(engine)
 
 def seed_database(session:Session):
     """Seed initial data into the database"""
@@ -0,0 +1,299 @@
+"""In-process load test of app.main:app against a synthetic database.
+
+Run through `script.py benchmark-api`, which starts one process per scale
+with DATABASE_URL pointing at that scale's database, since the app binds its
+engines at import time. Prints a JSON list of per-route results to stdout.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Tuple
+import httpx
+import orjson
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, delete, func, select
+from app.calculation import generate_timetable
+from app.crud.prayer import import_prayer_times, prayer_times
+from app.database import engine, init_db
+from app.models.location import Location
+from app.models.user import User
+from app.scripts.migrations import migrate
+from app.security import create_access_token, get_password_hash
+
+START_DATE = date(2025, 1, 1)
+TIMEZONES = ("Asia/Colombo", "Europe/London", "America/New_York", "Asia/Tokyo", "Africa/Cairo", "Australia/Sydney")
+ADMIN = "bench-admin"
+SEED_BATCH = 100  # locations per generate/insert round
+BATCH_KEYS = 100  # keys per POST /prayers/batch request; compare its keys/s with GET /prayers/single
+IMPORT_LOCATIONS = 100  # locations whose year after the seeded range the background import writes
+IMPORT_BATCH = 10000  # rows per import transaction
+LOGIN_USER, LOGIN_PASSWORD = "bench-user", "bench-password"
+LOGIN_WORKERS = 16  # concurrent clients of the login storm
+
+Request = Tuple[str, str, dict]  # method, url, json body or {}
+# Load run next to a measured route: (app, started, stop) -> summary; sets `started` once it loads the app
+Background = Callable[[object, asyncio.Event, asyncio.Event], Awaitable[dict]]
+
+def seed(locations: int, years: int):
+    """Create `locations` synthetic locations with `years` of generated prayer times, once"""
+    init_db()
+    migrate()
+    with Session(engine) as session:
+        if session.exec(select(func.count(Location.id))).one() == locations:
+            return
+
+        rng = random.Random(42)
+        session.add(User(username=ADMIN, email=f"{ADMIN}@example.com", hashed_password="!", role="admin"))
+        session.add_all(
+            Location(
+                city=f"Bench City {i}",
+                country=f"Bench Country {i % 50}",
+                latitude=round(rng.uniform(-55, 60), 4),
+                longitude=round(rng.uniform(-180, 180), 4),
+                timezone=TIMEZONES[i % len(TIMEZONES)]
+            )
+            for i in range(locations)
+        )
+        session.commit()
+
+        end_date = START_DATE + timedelta(days=365 * years - 1)
+        all_locations = session.exec(select(Location).order_by(Location.id)).all()
+        for offset in range(0, len(all_locations), SEED_BATCH):
+            batch = all_locations[offset:offset + SEED_BATCH]
+            import_prayer_times(session, generate_timetable(batch, START_DATE, end_date))
+            session.commit()
+
+def routes(locations: int, years: int) -> Dict[str, Callable[[random.Random], Request]]:
+    """Request factories per route, drawing random locations and dates"""
+    days = 365 * years
+
+    def location_id(rng):
+        return rng.randint(1, locations)
+
+    def day(rng, span=0):
+        return START_DATE + timedelta(days=rng.randint(0, days - 1 - span))
+
+    def multiple(rng):
+        start = day(rng, 30)
+        return ("GET", f"/prayers/multiple?location_id={location_id(rng)}&start_date={start}&end_date={start + timedelta(days=29)}", {})
+
+    def batch(rng):
+        return ("POST", "/prayers/batch", [
+            {"location_id": location_id(rng), "date": str(day(rng))} for _ in range(BATCH_KEYS)
+        ])
+
+    def bulk_update(rng):
+        start = day(rng, 10)
+        return ("PUT", "/prayers/bulk", [{
+            "city": f"Bench City {location_id(rng) - 1}", "start_date": str(start),
+            "end_date": str(start + timedelta(days=9)), "fajr": "05:00:00"
+        }])
+
+    return {
+        "GET /prayers/single": lambda rng: ("GET", f"/prayers/single?location_id={location_id(rng)}&date={day(rng)}", {}),
+        "GET /prayers/multiple": multiple,
+        "POST /prayers/batch": batch,
+        "GET /prayers/next": lambda rng: ("GET", f"/prayers/next?location_id={location_id(rng)}&at={day(rng)}T12:00:00Z", {}),
+        "GET /prayers/city/{city}": lambda rng: ("GET", f"/prayers/city/Bench City {location_id(rng) - 1}", {}),
+        "GET /locations/": lambda rng: ("GET", "/locations/?limit=100", {}),
+        "GET /locations/nearest": lambda rng: ("GET", f"/locations/nearest?lat={rng.uniform(-55, 60):.4f}&lon={rng.uniform(-180, 180):.4f}&k=5", {}),
+        "PUT /prayers/bulk": bulk_update,
+    }
+
+def bulk_import(years: int) -> Background:
+    """Upsert a year of rows for IMPORT_LOCATIONS locations through the writer engine, over and over.
+
+    Rows go to the year after the seeded range and are deleted afterwards,
+    so reads of seeded dates see the write lock, not the new rows.
+    """
+    async def background(app, started: asyncio.Event, stop: asyncio.Event) -> dict:
+        start = START_DATE + timedelta(days=365 * years)
+        with Session(engine) as session:
+            locations = session.exec(select(Location).order_by(Location.id).limit(IMPORT_LOCATIONS)).all()
+        rows = generate_timetable(locations, start, start + timedelta(days=364))
+
+        def import_batch(batch: List[dict]) -> int:
+            with Session(engine) as session:
+                written = import_prayer_times(session, batch, overwrite=True)
+                session.commit()
+            return written
+
+        imported = errors = 0
+        began = time.perf_counter()
+        started.set()
+        while not stop.is_set():
+            for offset in range(0, len(rows), IMPORT_BATCH):
+                try:
+                    imported += await asyncio.to_thread(import_batch, rows[offset:offset + IMPORT_BATCH])
+                except OperationalError:
+                    errors += 1  # e.g. "database is locked"
+                if stop.is_set():
+                    break
+        elapsed = time.perf_counter() - began
+
+        with Session(engine) as session:
+            session.exec(delete(prayer_times).where(prayer_times.c.date >= start))
+            session.commit()
+        return {
+            "name": "bulk import", "unit": "rows", "operations": imported, "errors": errors,
+            "throughput": round(imported / elapsed, 1)
+        }
+    return background
+
+def login_storm(workers: int = LOGIN_WORKERS) -> Background:
+    """`workers` clients posting /auth/login back to back with a valid password (a bcrypt verify each)"""
+    async def background(app, started: asyncio.Event, stop: asyncio.Event) -> dict:
+        with Session(engine) as session:
+            if not session.exec(select(User.id).where(User.username == LOGIN_USER)).first():
+                session.add(User(
+                    username=LOGIN_USER, email=f"{LOGIN_USER}@example.com",
+                    hashed_password=get_password_hash(LOGIN_PASSWORD), role="user"
+                ))
+                session.commit()
+
+        logins = errors = 0
+
+        async def worker(client: httpx.AsyncClient):
+            nonlocal logins, errors
+            while not stop.is_set():
+                response = await client.post("/auth/login", data={"username": LOGIN_USER, "password": LOGIN_PASSWORD})
+                if response.status_code == 200:
+                    logins += 1
+                else:
+                    errors += 1  # 503 once PASSWORD_HASH_MAX_PENDING or the auth queue is full
+
+        # A client of its own, so the login cookies do not replace the admin token
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            began = time.perf_counter()
+            started.set()
+            await asyncio.gather(*(worker(client) for _ in range(workers)))
+            elapsed = time.perf_counter() - began
+        return {
+            "name": "login storm", "unit": "logins", "operations": logins, "errors": errors,
+            "throughput": round(logins / elapsed, 1)
+        }
+    return background
+
+def scenarios(locations: int, years: int) -> Dict[str, Tuple[str, Background]]:
+    """Routes of routes() measured again under a background load: name -> (route, background).
+
+    Compare each with the route's own result to see what the load costs it.
+    """
+    return {
+        "GET /prayers/multiple + bulk import": ("GET /prayers/multiple", bulk_import(years)),
+        "GET /prayers/single + login storm": ("GET /prayers/single", login_storm()),
+    }
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+async def drive(client: httpx.AsyncClient, make_request: Callable, requests: int, concurrency: int, seed_value: int) -> dict:
+    """Send `requests` requests from `concurrency` concurrent workers"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(index: int):
+        nonlocal errors
+        rng = random.Random(seed_value * 1000 + index)
+        for _ in remaining:
+            method, url, body = make_request(rng)
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body or None)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+async def under_load(app, client: httpx.AsyncClient, make_request: Callable, background: Background,
+                     requests: int, concurrency: int, seed_value: int) -> dict:
+    """drive() while `background` loads the app; adds the background's summary"""
+    started, stop = asyncio.Event(), asyncio.Event()
+    task = asyncio.create_task(background(app, started, stop))
+    try:
+        await started.wait()
+        result = await drive(client, make_request, requests, concurrency, seed_value)
+    finally:
+        stop.set()
+        summary = await task
+    return {**result, "background": summary}
+
+async def run(locations: int, years: int, requests: int, concurrency: int, selected: List[str]) -> List[dict]:
+    from app.main import app, lifespan
+
+    token = create_access_token(data={"sub": ADMIN, "role": "admin"})
+    results = []
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"token": token}) as client:
+            for index, (name, make_request) in enumerate(routes(locations, years).items()):
+                if selected and name not in selected:
+                    continue
+                # Warm-up pass so imports, connection pools and lazy indexes are not measured
+                await drive(client, make_request, min(requests, concurrency * 2), concurrency, -index - 1)
+                result = await drive(client, make_request, requests, concurrency, index)
+                results.append({"scale": f"{locations}x{years}", "route": name, "concurrency": concurrency, **result})
+
+            all_routes = routes(locations, years)
+            for index, (name, (route, background)) in enumerate(scenarios(locations, years).items(), len(all_routes)):
+                if selected and name not in selected:
+                    continue
+                await drive(client, all_routes[route], min(requests, concurrency * 2), concurrency, -index - 1)
+                result = await under_load(app, client, all_routes[route], background, requests, concurrency, index)
+                results.append({"scale": f"{locations}x{years}", "route": name, "concurrency": concurrency, **result})
+    return results
+
+def compare(baseline: dict, current: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Report lines and regressions (throughput drop or p95 rise beyond `threshold` percent)"""
+    previous = {(result["scale"], result["route"]): result for result in baseline["results"]}
+    lines, regressions = [], []
+    for result in current["results"]:
+        key = (result["scale"], result["route"])
+        before = previous.get(key)
+        if before is None:
+            lines.append(f"{key[0]:>10} {key[1]:<28} new")
+            continue
+        throughput = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0.0
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        line = (
+            f"{key[0]:>10} {key[1]:<28} "
+            f"{before['throughput_rps']:>9.1f} → {result['throughput_rps']:>9.1f} rps ({throughput:+6.1f}%)  "
+            f"p95 {before['p95_ms']:>8.2f} → {result['p95_ms']:>8.2f} ms ({p95:+6.1f}%)"
+        )
+        lines.append(line)
+        if throughput < -threshold or p95 > threshold:
+            regressions.append(line)
+    return lines, regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--locations", type=int, required=True)
+    parser.add_argument("--years", type=int, required=True)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--route", action="append", default=[])
+    args = parser.parse_args()
+
+    seed(args.locations, args.years)
+    results = asyncio.run(run(args.locations, args.years, args.requests, args.concurrency, args.route))
+    sys.stdout.buffer.write(orjson.dumps(results))
+
+if __name__ == "__main__":
+    main()
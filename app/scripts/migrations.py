@@ -0,0 +1,120 @@
+from datetime import date
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select
+from app.database import engine
+from app.models.location import Location, normalize_name
+from app.models.prayer import PrayerTime
+from app.models.migration import SCHEMA_VERSION, SchemaMigration
+from app.models.job import Job
+
+# Each migration must be safe to run against a database created by
+# create_all from the current models, so fresh databases can be stamped.
+def _add_location_calculation_method(connection: Connection):
+    columns = {column["name"] for column in inspect(connection).get_columns("locations")}
+    if "calculation_method" not in columns:
+        connection.execute(text(
+            "ALTER TABLE locations ADD COLUMN calculation_method VARCHAR NOT NULL DEFAULT 'MWL'"
+        ))
+
+def _add_prayer_time_location_date_index(connection: Connection):
+    duplicates = connection.execute(text(
+        "SELECT location_id, date, COUNT(*) FROM prayer_times "
+        "GROUP BY location_id, date HAVING COUNT(*) > 1 LIMIT 5"
+    )).all()
+    if duplicates:
+        sample = ", ".join(f"location {row[0]} on {row[1]}" for row in duplicates)
+        raise RuntimeError(f"Duplicate prayer times must be removed first: {sample}")
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_prayer_times_location_id_date "
+        "ON prayer_times (location_id, date)"
+    ))
+
+def _add_prayer_time_updated_at_index(connection: Connection):
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_prayer_times_updated_at ON prayer_times (updated_at)"
+    ))
+
+def _add_location_lookup_keys(connection: Connection):
+    columns = {column["name"] for column in inspect(connection).get_columns("locations")}
+    for column in ("city_key", "country_key"):
+        if column not in columns:
+            connection.execute(text(f"ALTER TABLE locations ADD COLUMN {column} VARCHAR NOT NULL DEFAULT ''"))
+
+    # Normalization needs Python's unicodedata, so backfill row by row
+    rows = connection.execute(text("SELECT id, city, country FROM locations")).all()
+    if rows:
+        connection.execute(
+            text("UPDATE locations SET city_key = :city_key, country_key = :country_key WHERE id = :id"),
+            [{"id": row[0], "city_key": normalize_name(row[1]), "country_key": normalize_name(row[2])} for row in rows]
+        )
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_locations_city_key ON locations (city_key)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_locations_country_key ON locations (country_key)"))
+
+def _add_jobs_table(connection: Connection):
+    Job.__table__.create(connection, checkfirst=True)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "add locations.calculation_method", _add_location_calculation_method),
+    (2, "unique index on prayer_times (location_id, date)", _add_prayer_time_location_date_index),
+    (3, "index on prayer_times (updated_at)", _add_prayer_time_updated_at_index),
+    (4, "normalized locations.city_key / country_key", _add_location_lookup_keys),
+    (5, "jobs table for asynchronous bulk writes", _add_jobs_table),
+]
+assert MIGRATIONS[-1][0] == SCHEMA_VERSION, "Bump SCHEMA_VERSION along with MIGRATIONS"
+
+def applied_versions(bind: Engine = engine) -> set:
+    SchemaMigration.__table__.create(bind, checkfirst=True)
+    with Session(bind) as session:
+        return set(session.exec(select(SchemaMigration.version)).all())
+
+def migrate(bind: Engine = engine) -> List[str]:
+    """Apply pending migrations in order, each in its own transaction"""
+    applied = applied_versions(bind)
+    names = []
+    for version, name, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        with bind.begin() as connection:
+            upgrade(connection)
+            connection.execute(
+                SchemaMigration.__table__.insert().values(version=version, name=name)
+            )
+        names.append(name)
+    return names
+
+def stamp(bind: Engine = engine):
+    """Mark every migration as applied, for databases built by create_all"""
+    applied = applied_versions(bind)
+    with bind.begin() as connection:
+        for version, name, _ in MIGRATIONS:
+            if version not in applied:
+                connection.execute(
+                    SchemaMigration.__table__.insert().values(version=version, name=name)
+                )
+
+def explain_hot_queries(bind: Engine = engine) -> List[Tuple[str, List[str]]]:
+    """EXPLAIN QUERY PLAN for the prayer time and location lookups that must use an index"""
+    day = date(2025, 1, 1)
+    queries = [
+        ("/prayers/single", select(PrayerTime).where(
+            PrayerTime.location_id == 1, PrayerTime.date == day
+        )),
+        ("/prayers/multiple", select(PrayerTime).where(
+            PrayerTime.location_id == 1, PrayerTime.date >= day, PrayerTime.date <= date(2025, 12, 31)
+        ).order_by(PrayerTime.date)),
+        ("bulk conflict check", select(PrayerTime.id).where(
+            PrayerTime.location_id.in_([1, 2]), PrayerTime.date.in_([day, date(2025, 1, 2)])
+        )),
+        ("recently updated", select(PrayerTime).where(PrayerTime.updated_at >= day)),
+        ("/prayers/city name lookup", select(Location.id).where(Location.city_key == "colombo")),
+        ("/prayers/country name lookup", select(Location.id).where(Location.country_key == "sri lanka")),
+    ]
+    plans = []
+    with bind.connect() as connection:
+        for name, query in queries:
+            sql = str(query.compile(bind, compile_kwargs={"literal_binds": True}))
+            rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+            plans.append((name, [row[-1] for row in rows]))
+    return plans
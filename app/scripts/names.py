@@ -0,0 +1,108 @@
+"""Checks of place name normalization and the name-based routes, against a throwaway database.
+
+Run through `script.py check-names`, which points DATABASE_URL at a fresh
+SQLite file, since the app binds its engines at import time. Prints one
+line per failed check and exits 1 if any failed.
+"""
+import asyncio
+import sys
+from datetime import date, time
+from typing import List
+import httpx
+from sqlmodel import Session
+from app.database import engine, init_db
+from app.models.location import Location, normalize_name
+from app.models.prayer import PrayerTime
+from app.models.user import User
+from app.scripts.migrations import migrate
+from app.security import create_access_token
+
+ADMIN = "names-admin"
+CITIES = ("São Paulo", "İstanbul", "Malmö", "Colombo")
+
+# name -> expected normalize_name key
+KEYS = {
+    "São Paulo": "sao paulo",
+    "SAO PAULO": "sao paulo",
+    "  sao   paulo ": "sao paulo",
+    "SÃO PAULO": "sao paulo",
+    "İstanbul": "istanbul",
+    "ISTANBUL": "istanbul",
+    "İSTANBUL": "istanbul",
+    "Malmö": "malmo",
+    "MALMÖ": "malmo",
+    "Straße": "strasse",
+    "Colombo": "colombo",
+}
+
+# city route path -> city whose prayer times it should return
+CITY_LOOKUPS = {
+    "São Paulo": "São Paulo",
+    "SAO PAULO": "São Paulo",
+    "sao%20%20paulo": "São Paulo",
+    "İstanbul": "İstanbul",
+    "istanbul": "İstanbul",
+    "ISTANBUL": "İstanbul",
+    "malmo": "Malmö",
+    "colombo": "Colombo",
+}
+
+def seed():
+    init_db()
+    migrate()
+    with Session(engine) as session:
+        session.add(User(username=ADMIN, email=f"{ADMIN}@example.com", hashed_password="!", role="admin"))
+        for city in CITIES:
+            location = Location(city=city, country="Names", latitude=0, longitude=0, timezone="UTC")
+            session.add(location)
+            session.flush()
+            session.add(PrayerTime(
+                location_id=location.id, date=date(2025, 1, 1), fajr=time(5), dhuhr=time(12),
+                asr=time(15), maghrib=time(18), isha=time(19), calculation_method="MWL"
+            ))
+        session.commit()
+
+async def check_routes() -> List[str]:
+    from app.main import app, lifespan
+
+    failures = []
+    token = create_access_token(data={"sub": ADMIN, "role": "admin"})
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://names", cookies={"token": token}) as client:
+            ids = {location["city"]: location["id"] for location in (await client.get("/locations/")).json()}
+
+            for path, city in CITY_LOOKUPS.items():
+                response = await client.get(f"/prayers/city/{path}")
+                found = {row["location_id"] for row in response.json()} if response.status_code == 200 else set()
+                if found != {ids[city]}:
+                    failures.append(f"GET /prayers/city/{path}: {response.status_code}, expected {city}")
+
+            # Names that normalize to an existing city are rejected, on create and on rename
+            response = await client.post("/locations/", json={
+                "city": "sao paulo", "country": "Names", "latitude": 0, "longitude": 0, "timezone": "UTC"
+            })
+            if response.status_code != 400:
+                failures.append(f"POST /locations/ 'sao paulo': {response.status_code}, expected 400")
+            for city in ("COLOMBO ", "istanbul"):
+                response = await client.put(f"/locations/{ids['Malmö']}", json={"city": city})
+                if response.status_code != 400:
+                    failures.append(f"PUT /locations/ rename to {city!r}: {response.status_code}, expected 400")
+            response = await client.put(f"/locations/{ids['Colombo']}", json={"city": "COLOMBO"})
+            if response.status_code != 200:
+                failures.append(f"PUT /locations/ rename to its own key: {response.status_code}, expected 200")
+    return failures
+
+def main():
+    failures = [
+        f"normalize_name({name!r}) == {normalize_name(name)!r}, expected {key!r}"
+        for name, key in KEYS.items() if normalize_name(name) != key
+    ]
+    seed()
+    failures += asyncio.run(check_routes())
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
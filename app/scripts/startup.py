@@ -0,0 +1,51 @@
+"""Cold start of app.main in a fresh process: import, lifespan startup, first requests.
+
+Run through `script.py benchmark-startup`, which starts one process per run
+against the configured DATABASE_URL. Prints one JSON object to stdout.
+"""
+import time
+
+started = time.perf_counter()
+
+import argparse
+import asyncio
+import sys
+
+def elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 2)
+
+async def first_requests(app, lifespan, route: str) -> dict:
+    """Lifespan startup, then the same request twice: cold and warm"""
+    import httpx
+
+    timings = {}
+    phase = time.perf_counter()
+    async with lifespan(app):
+        timings["lifespan_ms"] = elapsed_ms(phase)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            for name in ("first_request_ms", "second_request_ms"):
+                phase = time.perf_counter()
+                response = await client.get(route)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"GET {route} answered {response.status_code}: {response.text[:200]}")
+                timings[name] = elapsed_ms(phase)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--route", default="/locations/?limit=1")
+    args = parser.parse_args()
+
+    phase = time.perf_counter()
+    from app.main import app, lifespan
+    result = {"import_ms": elapsed_ms(phase)}
+    result.update(asyncio.run(first_requests(app, lifespan, args.route)))
+    result["total_ms"] = elapsed_ms(started)
+    result["modules"] = len(sys.modules)
+
+    import orjson
+    sys.stdout.buffer.write(orjson.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import csv
+import os
+import time
+from datetime import date, datetime, time as clock, timezone
+from functools import lru_cache
+from typing import Callable, Dict, IO, Iterator, List, NamedTuple, Optional, Tuple
+import orjson
+from fastapi import HTTPException
+from sqlmodel import Session, select
+from app.database import engine
+from app.crud.prayer import PRAYER_FIELDS, import_prayer_times, resolve_locations
+from app.models.import_checkpoint import ImportCheckpoint
+from app.models.location import Location
+from app.models.prayer import PrayerTime
+
+FORMATS = ("csv", "ndjson")
+EXPORT_FIELDS = ("city", "date", *PRAYER_FIELDS, "calculation_method")
+
+# Timetables repeat a few thousand distinct times and dates, so parse each once
+parse_time = lru_cache(maxsize=None)(clock.fromisoformat)
+parse_date = lru_cache(maxsize=65536)(date.fromisoformat)
+
+class ImportResult(NamedTuple):
+    rows_read: int
+    rows_written: int
+    resumed_from: int
+    already_imported: bool = False
+
+def detect_format(path: str, format: Optional[str] = None) -> str:
+    """Explicit format, or one inferred from the file extension"""
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        format = "ndjson" if extension in (".ndjson", ".jsonl", ".json") else "csv"
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of {', '.join(FORMATS)}")
+    return format
+
+def read_records(stream: IO[str], format: str) -> Iterator[dict]:
+    if format == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield orjson.loads(line)
+
+def _fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _to_rows(session: Session, records: List[dict], first_line: int, locations: Dict[str, Tuple[int, str]]) -> List[dict]:
+    """Resolve cities not seen in earlier chunks with one query, then convert values"""
+    unknown = {record.get("city") for record in records} - locations.keys()
+    if unknown:
+        try:
+            resolved = resolve_locations(session, unknown)
+        except HTTPException as e:
+            raise RuntimeError(e.detail)
+        # Plain values: ORM instances would be expired, and reloaded, after every commit
+        locations.update({city: (location.id, location.calculation_method) for city, location in resolved.items()})
+
+    rows = []
+    for offset, record in enumerate(records):
+        try:
+            location_id, default_method = locations[record["city"]]
+            row = {"location_id": location_id, "date": parse_date(record["date"])}
+            for field in PRAYER_FIELDS:
+                row[field] = parse_time(record[field])
+            row["calculation_method"] = record.get("calculation_method") or default_method
+        except (KeyError, TypeError, ValueError) as e:
+            raise RuntimeError(f"Record {first_line + offset}: invalid or missing value ({e})")
+        rows.append(row)
+    return rows
+
+def import_timetable(
+    path: str,
+    format: Optional[str] = None,
+    chunk_size: int = 10000,
+    overwrite: bool = False,
+    restart: bool = False,
+    progress: Optional[Callable[[int, float], None]] = None
+) -> ImportResult:
+    """Stream a CSV/NDJSON timetable into prayer_times in committed chunks.
+
+    Each chunk is written with one multi-row statement and committed together
+    with the number of records consumed so far, so a failed run resumes after
+    the last committed chunk. Memory use is bounded by `chunk_size`.
+    """
+    format = detect_format(path, format)
+    source = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+    ImportCheckpoint.__table__.create(engine, checkfirst=True)
+
+    with Session(engine) as session:
+        checkpoint = session.get(ImportCheckpoint, source)
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(source=source, fingerprint=fingerprint)
+        elif restart or checkpoint.fingerprint != fingerprint:
+            checkpoint.fingerprint = fingerprint
+            checkpoint.rows_committed = 0
+            checkpoint.completed = False
+        elif checkpoint.completed:
+            return ImportResult(checkpoint.rows_committed, 0, checkpoint.rows_committed, already_imported=True)
+
+        resumed_from = checkpoint.rows_committed
+        rows_read, rows_written = resumed_from, 0
+        locations: Dict[str, Tuple[int, str]] = {}
+        started = time.perf_counter()
+
+        def commit_chunk(records: List[dict]):
+            nonlocal rows_read, rows_written
+            try:
+                rows = _to_rows(session, records, rows_read + 1, locations)
+                rows_written += import_prayer_times(session, rows, overwrite)
+                checkpoint.rows_committed = rows_read + len(records)
+                checkpoint.updated_at = datetime.now(timezone.utc)
+                session.add(checkpoint)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            rows_read += len(records)
+            if progress:
+                progress(rows_read, (rows_read - resumed_from) / max(time.perf_counter() - started, 1e-9))
+
+        with open(path, newline="" if format == "csv" else None, encoding="utf-8") as stream:
+            records = read_records(stream, format)
+            for _ in range(resumed_from):
+                if next(records, None) is None:
+                    break
+
+            chunk: List[dict] = []
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    commit_chunk(chunk)
+                    chunk = []
+            if chunk:
+                commit_chunk(chunk)
+
+        checkpoint.completed = True
+        session.add(checkpoint)
+        session.commit()
+        return ImportResult(rows_read, rows_written, resumed_from)
+
+def export_timetable(
+    out: IO[str],
+    format: str = "csv",
+    city: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    chunk_size: int = 10000,
+    progress: Optional[Callable[[int, float], None]] = None
+) -> int:
+    """Write prayer times as CSV/NDJSON in the import format, streaming from the database"""
+    query = (
+        select(Location.city, PrayerTime.date, *(getattr(PrayerTime, field) for field in PRAYER_FIELDS), PrayerTime.calculation_method)
+        .join(Location)
+        .order_by(PrayerTime.location_id, PrayerTime.date)
+    )
+    if city is not None:
+        query = query.where(Location.city == city)
+    if start_date is not None:
+        query = query.where(PrayerTime.date >= start_date)
+    if end_date is not None:
+        query = query.where(PrayerTime.date <= end_date)
+
+    writer = csv.writer(out) if format == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+
+    written = 0
+    started = time.perf_counter()
+    with Session(engine) as session:
+        result = session.execute(query.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            if writer:
+                writer.writerows(rows)
+            else:
+                out.write("".join(
+                    orjson.dumps(dict(zip(EXPORT_FIELDS, row))).decode() + "\n" for row in rows
+                ))
+            written += len(rows)
+            if progress:
+                progress(written, written / max(time.perf_counter() - started, 1e-9))
+    return written
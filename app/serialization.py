@@ -0,0 +1,34 @@
+from typing import Optional, Sequence, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Row
+
+# Matches pydantic's JSON output, which writes UTC offsets as "Z"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+def response_columns(model, schema: Type[BaseModel]) -> tuple:
+    """The model's columns for every field of `schema`, in the schema's order"""
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+def json_response(content, headers: Optional[dict] = None) -> Response:
+    """JSON response for plain dicts/lists of database values, encoded with orjson"""
+    return Response(content=orjson.dumps(content, option=ORJSON_OPTIONS), media_type="application/json", headers=headers)
+
+def encode_row(row: Row) -> bytes:
+    return orjson.dumps(row._asdict(), option=ORJSON_OPTIONS)
+
+def encode_rows(rows: Sequence[Row]) -> bytes:
+    """Encode column rows as a JSON array without building a model per row.
+
+    Rows selected with `response_columns` already have the response's field
+    names and database types, so per-row validation would only copy them.
+    """
+    if not rows:
+        return b"[]"
+    keys = rows[0]._fields
+    return orjson.dumps([dict(zip(keys, row)) for row in rows], option=ORJSON_OPTIONS)
+
+def rows_response(response: Response, rows: Sequence[Row]) -> Response:
+    """JSON response for `rows`, keeping headers already set on the injected `response`"""
+    return Response(content=encode_rows(rows), media_type="application/json", headers=dict(response.headers))
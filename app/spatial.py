@@ -0,0 +1,154 @@
+import heapq
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .config import get_settings
+
+settings = get_settings()
+
+EARTH_RADIUS_KM = 6371.0088
+# Leaf cell edge on the unit sphere's bounding cube, roughly 100 km of chord
+CELL_SIZE = 100 / EARTH_RADIUS_KM
+# Each level's cells are twice as wide as the one below; the top level
+# covers the cube [-1, 1]^3 in at most two cells per axis
+DEPTH = math.ceil(math.log2(1 / CELL_SIZE))
+
+Point = Tuple[float, float, float]
+Cell = Tuple[int, int, int]
+
+def unit_vector(latitude: float, longitude: float) -> Point:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+def chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+def _leaf(point: Point) -> Cell:
+    return (math.floor(point[0] / CELL_SIZE), math.floor(point[1] / CELL_SIZE), math.floor(point[2] / CELL_SIZE))
+
+def _parent(cell: Cell) -> Cell:
+    return (cell[0] >> 1, cell[1] >> 1, cell[2] >> 1)
+
+def _box_distance(point: Point, cell: Cell, size: float) -> float:
+    """Shortest distance from `point` to anywhere in `cell`"""
+    total = 0.0
+    for axis, index in zip(point, cell):
+        low = index * size
+        gap = low - axis if axis < low else axis - low - size
+        if gap > 0:
+            total += gap * gap
+    return math.sqrt(total)
+
+class NearestLocationIndex:
+    """Octree-style grid of location unit vectors for k-nearest queries.
+
+    Locations are bucketed by their position on the unit sphere, so distances
+    are straight-line chords with no longitude wrap or pole special cases.
+    Leaf cells hold points; each coarser level records which of its child
+    cells are occupied. A query expands cells best-first by their exact
+    distance to the query point and stops once no remaining cell can hold
+    anything closer than the current k-th result, so dense and empty regions
+    cost about the same.
+
+    Each entry keeps the location's response fields so results can be served
+    without the database. Writes through `location.py` update single entries;
+    the whole index is reloaded after NEAREST_INDEX_TTL to pick up other
+    workers' writes.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._leaves: Dict[Cell, Dict[int, Point]] = {}
+        # _children[level][cell] → occupied cells one level down (level 1 = parents of leaves)
+        self._children: List[Dict[Cell, Set[Cell]]] = [{} for _ in range(DEPTH + 1)]
+        self._entries: Dict[int, Tuple[Point, dict]] = {}
+        self._expires: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._expires is not None and self._expires > time.monotonic()
+
+    async def load(self, session: AsyncSession, columns: tuple):
+        rows = (await session.exec(select(*columns))).all()
+        with self._lock:
+            self._leaves = {}
+            self._children = [{} for _ in range(DEPTH + 1)]
+            self._entries = {}
+            for row in rows:
+                self._add(row._asdict())
+            self._expires = time.monotonic() + self.ttl
+
+    def upsert(self, location: dict):
+        with self._lock:
+            if self._expires is None:
+                return  # loaded with current data on first use
+            self._discard(location["id"])
+            self._add(location)
+
+    def remove(self, location_id: int):
+        with self._lock:
+            self._discard(location_id)
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> List[Tuple[dict, float]]:
+        """Up to `k` (location, distance_km) pairs, closest first"""
+        query = unit_vector(latitude, longitude)
+        best: List[Tuple[float, int]] = []  # max-heap of (-chord, id)
+        with self._lock:
+            top_size = CELL_SIZE * (1 << DEPTH)
+            frontier = [(_box_distance(query, cell, top_size), DEPTH, cell) for cell in self._children[DEPTH]]
+            heapq.heapify(frontier)
+            while frontier:
+                distance, level, cell = heapq.heappop(frontier)
+                if len(best) == k and distance >= -best[0][0]:
+                    break
+                if level == 0:
+                    for location_id, point in self._leaves[cell].items():
+                        chord = math.dist(query, point)
+                        if len(best) < k:
+                            heapq.heappush(best, (-chord, location_id))
+                        elif chord < -best[0][0]:
+                            heapq.heapreplace(best, (-chord, location_id))
+                    continue
+                size = CELL_SIZE * (1 << (level - 1))
+                for child in self._children[level][cell]:
+                    heapq.heappush(frontier, (_box_distance(query, child, size), level - 1, child))
+
+            return [
+                (self._entries[location_id][1], chord_to_km(-negative_chord))
+                for negative_chord, location_id in sorted(best, reverse=True)
+            ]
+
+    def _add(self, location: dict):
+        point = unit_vector(location["latitude"], location["longitude"])
+        cell = _leaf(point)
+        self._leaves.setdefault(cell, {})[location["id"]] = point
+        self._entries[location["id"]] = (point, location)
+        for level in range(1, DEPTH + 1):
+            parent = _parent(cell)
+            self._children[level].setdefault(parent, set()).add(cell)
+            cell = parent
+
+    def _discard(self, location_id: int):
+        entry = self._entries.pop(location_id, None)
+        if entry is None:
+            return
+        cell = _leaf(entry[0])
+        bucket = self._leaves[cell]
+        del bucket[location_id]
+        if bucket:
+            return
+        del self._leaves[cell]
+        # Unlink now-empty cells up the tree
+        for level in range(1, DEPTH + 1):
+            parent = _parent(cell)
+            siblings = self._children[level][parent]
+            siblings.discard(cell)
+            if siblings:
+                return
+            del self._children[level][parent]
+            cell = parent
+
+nearest_locations = NearestLocationIndex(settings.NEAREST_INDEX_TTL)
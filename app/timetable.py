@@ -0,0 +1,201 @@
+import threading
+import time
+from datetime import date, datetime, time as clock, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .config import get_settings
+from .crud.prayer import PRAYER_FIELDS, PRAYER_TIME_COLUMNS
+from .generations import Generation, Generations
+from .models.prayer import PrayerTime
+
+if TYPE_CHECKING:
+    import numpy as np
+
+settings = get_settings()
+
+EPOCH = datetime(1970, 1, 1)
+DAYS = 366
+
+class PrayerRow(NamedTuple):
+    """A prayer_times row rebuilt from the store, shaped like a PRAYER_TIME_COLUMNS row"""
+    location_id: int
+    date: date
+    fajr: clock
+    dhuhr: clock
+    asr: clock
+    maghrib: clock
+    isha: clock
+    calculation_method: str
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+class YearBlock(NamedTuple):
+    """One location's year, indexed by day of year (0-based)"""
+    ids: "np.ndarray"       # int64, 0 where the day has no row
+    minutes: "np.ndarray"   # uint16 (DAYS, 5), minutes after local midnight per PRAYER_FIELDS
+    methods: "np.ndarray"   # uint8 codes into TimetableStore.methods
+    created: "np.ndarray"   # int64 microseconds since the epoch
+    updated: "np.ndarray"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self)
+
+def _new_block() -> YearBlock:
+    # numpy is imported when the store is first used, not at startup
+    import numpy as np
+    return YearBlock(
+        np.zeros(DAYS, np.int64),
+        np.zeros((DAYS, len(PRAYER_FIELDS)), np.uint16),
+        np.zeros(DAYS, np.uint8),
+        np.zeros(DAYS, np.int64),
+        np.zeros(DAYS, np.int64),
+    )
+
+def _microseconds(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+class TimetableStore:
+    """Read-side copy of prayer_times as packed per-location, per-year arrays.
+
+    A location-year takes ~12 KB instead of hundreds of ORM objects. Each
+    location is loaded with one indexed query the first time it is read
+    (or all at once by `load_all` at startup), dropped by `invalidate` when
+    its rows change, and reloaded after TIMETABLE_STORE_TTL so other workers'
+    writes show up. A location read before an invalidation is served to that
+    request but not stored. Locations with times that are not whole minutes
+    are not stored and keep being read from the database.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.methods: List[str] = []
+        self._method_codes: Dict[str, int] = {}
+        # location_id -> (expires, {year: block}), or None for "read from the DB"
+        self._locations: Dict[int, tuple] = {}
+        self._aware = False
+        self._lock = threading.Lock()
+        self._generations = Generations()
+
+    async def rows(self, session: AsyncSession, location_id: int, start: date, end: date) -> Optional[List[PrayerRow]]:
+        """Rows for a location between two dates, or None if it must be read from the DB"""
+        with self._lock:
+            entry = self._locations.get(location_id)
+        if entry is None or entry[0] < time.monotonic():
+            generation = self._generations.get(location_id)
+            loaded = (await session.exec(
+                select(*PRAYER_TIME_COLUMNS).where(PrayerTime.location_id == location_id).order_by(PrayerTime.date)
+            )).all()
+            entry = self._store(location_id, loaded, generation)
+        years = entry[1]
+        if years is None:
+            return None
+
+        import numpy as np
+
+        rows = []
+        for year in range(start.year, end.year + 1):
+            block = years.get(year)
+            if block is None:
+                continue
+            first = date(year, 1, 1)
+            low = (max(start, first) - first).days
+            high = (min(end, date(year, 12, 31)) - first).days
+            for day in np.flatnonzero(block.ids[low:high + 1]) + low:
+                rows.append(self._row(location_id, first + timedelta(days=int(day)), block, day))
+        return rows
+
+    async def load_all(self, session: AsyncSession, chunk_size: int = 10000):
+        """Load every location in one ordered pass over prayer_times"""
+        # Any location invalidated from here on was read before its write
+        generations = self._generations.snapshot()
+        result = await session.stream(
+            select(*PRAYER_TIME_COLUMNS)
+            .order_by(PrayerTime.location_id, PrayerTime.date)
+            .execution_options(yield_per=chunk_size)
+        )
+        location_id, pending = None, []
+        async for rows in result.partitions():
+            for row in rows:
+                if row.location_id != location_id and pending:
+                    self._store(location_id, pending, generations(location_id))
+                    pending = []
+                location_id = row.location_id
+                pending.append(row)
+        if pending:
+            self._store(location_id, pending, generations(location_id))
+
+    def invalidate(self, location_id: int):
+        with self._lock:
+            self._generations.bump(location_id)
+            self._locations.pop(location_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generations.bump_all()
+            self._locations.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stored = [years for _, years in self._locations.values() if years is not None]
+        blocks = [block for years in stored for block in years.values()]
+        return {
+            "locations": len(stored),
+            "location_years": len(blocks),
+            "bytes": sum(block.nbytes for block in blocks),
+        }
+
+    def _store(self, location_id: int, rows: Sequence, generation: Generation) -> tuple:
+        entry = (time.monotonic() + self.ttl, self._build(rows))
+        with self._lock:
+            if self._generations.current(location_id, generation):
+                self._locations[location_id] = entry
+        return entry
+
+    def _build(self, rows: Sequence) -> Optional[Dict[int, YearBlock]]:
+        years: Dict[int, YearBlock] = {}
+        for row in rows:
+            times = [getattr(row, field) for field in PRAYER_FIELDS]
+            if any(value.second or value.microsecond for value in times):
+                return None
+            self._aware = self._aware or row.updated_at.tzinfo is not None
+
+            block = years.get(row.date.year)
+            if block is None:
+                block = years[row.date.year] = _new_block()
+            day = row.date.timetuple().tm_yday - 1
+            block.ids[day] = row.id
+            block.minutes[day] = [value.hour * 60 + value.minute for value in times]
+            block.methods[day] = self._method_code(row.calculation_method)
+            block.created[day] = _microseconds(row.created_at)
+            block.updated[day] = _microseconds(row.updated_at)
+        return years
+
+    def _method_code(self, method: str) -> int:
+        with self._lock:
+            code = self._method_codes.get(method)
+            if code is None:
+                code = self._method_codes[method] = len(self.methods)
+                self.methods.append(method)
+            return code
+
+    def _timestamp(self, microseconds) -> datetime:
+        value = EPOCH + timedelta(microseconds=int(microseconds))
+        return value.replace(tzinfo=timezone.utc) if self._aware else value
+
+    def _row(self, location_id: int, day: date, block: YearBlock, index: int) -> PrayerRow:
+        minutes = block.minutes[index].tolist()
+        return PrayerRow(
+            location_id,
+            day,
+            *(clock(value // 60, value % 60) for value in minutes),
+            self.methods[block.methods[index]],
+            int(block.ids[index]),
+            self._timestamp(block.created[index]),
+            self._timestamp(block.updated[index]),
+        )
+
+timetable_store = TimetableStore(settings.TIMETABLE_STORE_TTL)
@@ -1,10 +1,269 @@
 from sqlmodel import create_engine, Session
 from app.database import init_db
 from app.scripts.database import reset_database, seed_database
+from app.scripts.migrations import migrate as apply_migrations, explain_hot_queries
+from datetime import datetime
+from typing import List, Optional
+import json
+import os
+import subprocess
+import sys
 import typer
 
 app = typer.Typer()
 
+@app.command()
+def migrate():
+    """Apply pending schema migrations without dropping data"""
+    init_db()
+    try:
+        applied = apply_migrations()
+    except RuntimeError as e:
+        typer.echo(f"❌ Migration failed: {e}")
+        raise typer.Exit(code=1)
+
+    for name in applied:
+        typer.echo(f"  → {name}")
+    typer.echo(f"✅ Applied {len(applied)} migration(s)" if applied else "✅ Database schema is up to date")
+
+
+@app.command()
+def explain_queries():
+    """Show query plans for hot prayer time lookups; fails on full table scans"""
+    full_scans = 0
+    for name, plan in explain_hot_queries():
+        typer.echo(f"{name}:")
+        for step in plan:
+            typer.echo(f"  {step}")
+            if step.startswith(("SCAN prayer_times", "SCAN locations")):
+                full_scans += 1
+
+    if full_scans:
+        typer.echo(f"❌ {full_scans} full table scan(s). Run 'migrate' first.")
+        raise typer.Exit(code=1)
+    typer.echo("✅ All hot queries use an index")
+
+
+def _report_progress(rows: int, rate: float):
+    typer.echo(f"  → {rows:,} rows ({rate:,.0f} rows/s)", err=True)
+
+
+@app.command()
+def import_timetable(
+    path: str = typer.Argument(..., help="CSV or NDJSON file with city, date, fajr, dhuhr, asr, maghrib, isha[, calculation_method]"),
+    format: Optional[str] = typer.Option(None, help="csv or ndjson; defaults to the file extension"),
+    chunk_size: int = typer.Option(10_000, help="Rows per committed chunk"),
+    overwrite: bool = typer.Option(False, help="Replace existing rows instead of skipping them"),
+    restart: bool = typer.Option(False, help="Ignore the saved checkpoint and start from the first row")
+):
+    """Stream a timetable file into prayer_times, resuming after the last committed chunk"""
+    from app.scripts.timetable import import_timetable as run_import
+
+    init_db()
+    try:
+        result = run_import(path, format, chunk_size, overwrite, restart, progress=_report_progress)
+    except (RuntimeError, ValueError, OSError) as e:
+        typer.echo(f"❌ Import stopped: {e}")
+        typer.echo("Committed chunks are kept; run the same command again to resume.")
+        raise typer.Exit(code=1)
+
+    if result.already_imported:
+        typer.echo(f"✅ {path} was already imported ({result.rows_read:,} rows). Use --restart to import it again.")
+        return
+    if result.resumed_from:
+        typer.echo(f"Resumed after row {result.resumed_from:,}")
+    typer.echo(f"✅ Imported {result.rows_written:,} of {result.rows_read - result.resumed_from:,} rows")
+
+
+@app.command()
+def export_timetable(
+    path: str = typer.Argument("-", help="Output file, or - for stdout"),
+    format: Optional[str] = typer.Option(None, help="csv or ndjson; defaults to the file extension"),
+    city: Optional[str] = typer.Option(None, help="Only this city"),
+    start_date: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"]),
+    end_date: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"]),
+    chunk_size: int = typer.Option(10_000, help="Rows fetched per round trip")
+):
+    """Stream prayer times to CSV or NDJSON in the import-timetable format"""
+    from app.scripts.timetable import detect_format, export_timetable as run_export
+
+    format = detect_format(path, format or ("csv" if path == "-" else None))
+    out = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        written = run_export(
+            out, format, city,
+            start_date.date() if start_date else None,
+            end_date.date() if end_date else None,
+            chunk_size, progress=_report_progress
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    typer.echo(f"✅ Exported {written:,} rows", err=True)
+
+
+@app.command()
+def check_names():
+    """Check place name normalization and the city/country routes against a throwaway database"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "names.db")
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "ASYNC_DATABASE_URL": ""}
+        completed = subprocess.run([sys.executable, "-m", "app.scripts.names"], env=env)
+    if completed.returncode != 0:
+        typer.echo("❌ Name lookups failed")
+        raise typer.Exit(code=1)
+    typer.echo("✅ Name lookups passed")
+
+
+@app.command()
+def benchmark_api(
+    scale: List[str] = typer.Option(["10x1", "1000x1", "10000x1"], help="LOCATIONSxYEARS of seeded data; repeat for several"),
+    requests: int = typer.Option(500, help="Measured requests per route"),
+    concurrency: int = typer.Option(16, help="Concurrent in-flight requests"),
+    route: List[str] = typer.Option([], help="Only these routes or scenarios, e.g. 'GET /prayers/multiple'"),
+    output: str = typer.Option("benchmark-results.json", help="Where to write the JSON results"),
+    data_dir: str = typer.Option(".benchmarks", help="Seeded databases are kept here and reused")
+):
+    """Load-test the app in-process per route and scale, writing throughput and latency percentiles"""
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    for name in scale:
+        try:
+            locations, years = (int(part) for part in name.lower().split("x"))
+        except ValueError:
+            typer.echo(f"❌ Invalid scale '{name}', expected LOCATIONSxYEARS such as 1000x1")
+            raise typer.Exit(code=1)
+
+        # One process per scale: the app binds its database engines at import time
+        database = os.path.abspath(os.path.join(data_dir, f"azan-{locations}x{years}.db"))
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "ASYNC_DATABASE_URL": ""}
+        command = [
+            sys.executable, "-m", "app.scripts.loadtest",
+            "--locations", str(locations), "--years", str(years),
+            "--requests", str(requests), "--concurrency", str(concurrency),
+            *(argument for selected in route for argument in ("--route", selected)),
+        ]
+        typer.echo(f"⏱  {name}: seeding (first run only) and measuring...", err=True)
+        completed = subprocess.run(command, env=env, stdout=subprocess.PIPE)
+        if completed.returncode != 0:
+            typer.echo(f"❌ Benchmark for {name} failed")
+            raise typer.Exit(code=1)
+
+        for result in json.loads(completed.stdout):
+            results.append(result)
+            typer.echo(
+                f"{result['scale']:>10} {result['route']:<36} {result['throughput_rps']:>9.1f} rps  "
+                f"p50 {result['p50_ms']:>7.2f}  p95 {result['p95_ms']:>7.2f}  p99 {result['p99_ms']:>7.2f} ms"
+                + (f"  ({result['errors']} errors)" if result["errors"] else "")
+            )
+            if "background" in result:
+                background = result["background"]
+                typer.echo(
+                    f"{'':>10} {'  while ' + background['name']:<36} {background['throughput']:>9.1f} {background['unit']}/s"
+                    + (f"  ({background['errors']} errors)" if background["errors"] else "")
+                )
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit or None,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "requests": requests,
+            "concurrency": concurrency,
+            "results": results,
+        }, f, indent=2)
+    typer.echo(f"✅ Results written to {output}")
+
+
+@app.command()
+def benchmark_compare(
+    baseline: str = typer.Argument(..., help="Results file from the earlier run"),
+    current: str = typer.Argument(..., help="Results file from the run to check"),
+    threshold: float = typer.Option(10.0, help="Allowed throughput drop / p95 increase in percent")
+):
+    """Compare two benchmark-api result files; exits 1 on regressions beyond the threshold"""
+    from app.scripts.loadtest import compare
+
+    with open(baseline) as f:
+        before = json.load(f)
+    with open(current) as f:
+        after = json.load(f)
+
+    typer.echo(f"{before.get('commit')} → {after.get('commit')}")
+    lines, regressions = compare(before, after, threshold)
+    for line in lines:
+        typer.echo(line)
+
+    if regressions:
+        typer.echo(f"❌ {len(regressions)} route(s) regressed by more than {threshold}%")
+        raise typer.Exit(code=1)
+    typer.echo("✅ No regressions")
+
+
+@app.command()
+def benchmark_startup(
+    runs: int = typer.Option(5, help="Fresh processes to start; medians are reported"),
+    route: str = typer.Option("/locations/?limit=1", help="Path requested after startup"),
+    output: Optional[str] = typer.Option(None, help="Also write the runs as JSON here")
+):
+    """Measure worker cold start: app import, lifespan startup and first request latency"""
+    from statistics import median
+
+    samples = []
+    for _ in range(runs):
+        started = datetime.now()
+        completed = subprocess.run(
+            [sys.executable, "-m", "app.scripts.startup", "--route", route],
+            stdout=subprocess.PIPE
+        )
+        if completed.returncode != 0:
+            typer.echo("❌ Startup failed; is the database migrated?")
+            raise typer.Exit(code=1)
+        sample = json.loads(completed.stdout)
+        sample["process_ms"] = round((datetime.now() - started).total_seconds() * 1000, 2)
+        samples.append(sample)
+
+    for phase in ("process_ms", "import_ms", "lifespan_ms", "first_request_ms", "second_request_ms"):
+        typer.echo(f"{phase:<18} {median(sample[phase] for sample in samples):>9.1f} ms (median of {runs})")
+    typer.echo(f"{'modules':<18} {samples[-1]['modules']:>9}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({"route": route, "python": sys.version.split()[0], "runs": samples}, f, indent=2)
+        typer.echo(f"✅ Results written to {output}")
+
+
+@app.command()
+def benchmark_serialization(
+    rows: List[int] = typer.Option([10_000, 100_000], help="Result sizes to time"),
+    repeat: int = typer.Option(3, help="Runs per size; the best is reported")
+):
+    """Compare response_model serialization with the column/orjson list path"""
+    from app.scripts.benchmark import benchmark_serialization as run
+
+    for result in run(rows, repeat):
+        typer.echo(
+            f"{result['rows']:>8} rows: response_model {result['response_model_ms']} ms, "
+            f"columns+orjson {result['columns_orjson_ms']} ms ({result['speedup']}x)"
+        )
+
+
+@app.command()
+def benchmark_timetable(years: int = typer.Option(3, help="Years of daily rows for one location")):
+    """Report memory per location-year for ORM entities and the timetable store"""
+    from app.scripts.benchmark import benchmark_timetable_memory
+
+    result = benchmark_timetable_memory(years)
+    typer.echo(f"ORM entities:    {result['orm_bytes_per_location_year'] / 1024:.1f} KiB per location-year")
+    typer.echo(
+        f"Timetable store: {result['store_bytes_per_location_year'] / 1024:.1f} KiB per location-year "
+        f"({result['store_array_bytes_per_location_year'] / 1024:.1f} KiB of arrays)"
+    )
+
+
 @app.command()
 def migrate_fresh():
     """Drop and recreate database schema"""